@@ -0,0 +1,138 @@
+# admission.py
+import math
+import time
+import threading
+from collections import deque, Counter
+from contextlib import contextmanager
+from metrics import REGISTRY
+
+QUEUE_DEPTH = REGISTRY.gauge('quizzr_admission_queue_depth', "Work waiting for a slot, by lane.", ['lane'])
+IN_FLIGHT = REGISTRY.gauge('quizzr_admission_in_flight', "Work currently holding a slot, by lane.", ['lane'])
+WAIT_SECONDS = REGISTRY.histogram('quizzr_admission_wait_seconds', "Time spent queued before a slot was free.", ['lane'])
+REJECTED = REGISTRY.counter('quizzr_admission_rejected_total', "Work turned away as busy, by lane and reason.", ['lane', 'reason'])
+
+class Busy(Exception):
+    """
+    Raised when a lane cannot take more work; retry_after is a suggested wait in whole seconds.
+    """
+
+    def __init__(self, lane, reason, retry_after):
+        super().__init__(f"{lane} is busy ({reason}); retry after {retry_after}s")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lane:
+    """
+    At most `limit` units of work run at once; up to `queue_size` more wait in FIFO order, and anything
+    beyond that is rejected immediately. A session may hold at most `per_session` running or queued
+    units, so one user clicking repeatedly cannot fill the queue ahead of everyone else.
+    """
+
+    def __init__(self, name, limit, queue_size, max_wait=5.0, per_session=1):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.per_session = per_session
+        self.active = 0
+        self._waiting = deque()
+        self._sessions = Counter()
+        # Moving average of how long a unit holds its slot, for retry-after estimates
+        self._service_seconds = 1.0
+        self._cond = threading.Condition()
+
+    def retry_after(self):
+        ahead = len(self._waiting) + 1
+        return max(1, math.ceil(self._service_seconds * ahead / max(self.limit, 1)))
+
+    def _reject(self, reason):
+        REJECTED.inc(lane=self.name, reason=reason)
+        return Busy(self.name, reason, self.retry_after())
+
+    def _update_gauges(self):
+        QUEUE_DEPTH.set(len(self._waiting), lane=self.name)
+        IN_FLIGHT.set(self.active, lane=self.name)
+
+    def enqueue(self, session_id=None):
+        """
+        Take a place in the queue without waiting for a slot; raises Busy if the queue is full or the
+        session already has its share. Pass the ticket to run().
+        """
+        with self._cond:
+            if session_id is not None and self._sessions[session_id] >= self.per_session:
+                raise self._reject('session')
+            if self.active >= self.limit and len(self._waiting) >= self.queue_size:
+                raise self._reject('queue_full')
+            self._sessions[session_id] += 1
+            ticket = [session_id, time.monotonic()]
+            self._waiting.append(ticket)
+            self._update_gauges()
+            return ticket
+
+    def _leave(self, session_id):
+        self._sessions[session_id] -= 1
+        if self._sessions[session_id] <= 0:
+            del self._sessions[session_id]
+
+    @contextmanager
+    def run(self, ticket, timeout=None):
+        """
+        Wait for the ticket to reach the front and a slot to free up, then hold the slot for the
+        body. Raises Busy (and gives up the place) if that takes longer than timeout seconds.
+        """
+        session_id, enqueued = ticket
+        expires = None if timeout is None else enqueued + timeout
+        with self._cond:
+            while self._waiting[0] is not ticket or self.active >= self.limit:
+                remaining = None if expires is None else expires - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self._leave(session_id)
+                    self._update_gauges()
+                    self._cond.notify_all()
+                    raise self._reject('timeout')
+                self._cond.wait(remaining)
+            self._waiting.popleft()
+            self.active += 1
+            self._update_gauges()
+            # The next ticket may also fit under the limit
+            self._cond.notify_all()
+        started = time.monotonic()
+        WAIT_SECONDS.observe(started - enqueued, lane=self.name)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._leave(session_id)
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * (time.monotonic() - started)
+                self._update_gauges()
+                self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, session_id=None, timeout=None):
+        """
+        enqueue() and run() for work done on the calling thread, waiting at most max_wait by default.
+        """
+        ticket = self.enqueue(session_id)
+        with self.run(ticket, self.max_wait if timeout is None else timeout):
+            yield
+
+
+class AdmissionController:
+    """
+    The named lanes that gate expensive upstream work, shared by every request handler.
+    """
+
+    def __init__(self, lanes):
+        self.lanes = {lane.name: lane for lane in lanes}
+
+    def lane(self, name):
+        return self.lanes[name]
+
+    def stats(self):
+        return {name: {'in_flight': lane.active, 'queued': len(lane._waiting), 'limit': lane.limit,
+                       'queue_size': lane.queue_size, 'retry_after': lane.retry_after()}
+                for name, lane in self.lanes.items()}
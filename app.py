@@ -1,35 +1,84 @@
-from flask import Flask, render_template, request, session, redirect, url_for, jsonify
+from flask import Flask, render_template, request, session, redirect, url_for, jsonify, Response, stream_with_context, g
 from quiz import Quiz
-from web_search import get_official_documentation
+from scheduler import LeitnerScheduler
+from quiz_generator import stream_question
+from web_search import get_cached_documentation, documentation_query
+from doc_jobs import DocumentationJobs
+from admission import AdmissionController, Lane, Busy
+from prefetch import Prefetcher
+from resilience import get_guard
+from session_store import create_session_store
+from metrics import REGISTRY, current_trace, annotate
+from providers import load_env
 import os
+import json
+import time
 import logging
-from threading import Thread
-from queue import Queue
+
+# Settings in a .env file apply to everything configured below
+load_env()
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
-logging.basicConfig(level=logging.DEBUG)
-
-question_queue = Queue()
-
-def serialize_quiz(quiz):
-    return {
-        'num_questions': quiz.num_questions,
-        'difficulty': quiz.difficulty,
-        'topic': quiz.topic,
-        'score': quiz.score,
-        'current_question': quiz.current_question,
-        'user_performance': quiz.user_performance,
-        'questions': quiz.questions
-    }
-
-def deserialize_quiz(data):
-    quiz = Quiz(data['num_questions'], data['difficulty'], data['topic'])
-    quiz.score = data['score']
-    quiz.current_question = data['current_question']
-    quiz.user_performance = data['user_performance']
-    quiz.questions = data['questions']
-    return quiz
+app.secret_key = os.environ.get('FLASK_SECRET_KEY') or os.urandom(24)
+logging.basicConfig(level=logging.INFO)
+trace_log = logging.getLogger('quizzr.trace')
+
+REQUEST_SECONDS = REGISTRY.histogram('quizzr_http_request_seconds', "Flask request latency by route.", ['route', 'method', 'status'])
+SERVING_PATHS = REGISTRY.counter('quizzr_question_serving_path_total', "How each served question was obtained.", ['path'])
+
+prefetcher = Prefetcher(
+    max_workers=int(os.environ.get('PREFETCH_WORKERS', 4)),
+    max_in_flight=int(os.environ.get('PREFETCH_MAX_IN_FLIGHT', 8)),
+    depth=int(os.environ.get('PREFETCH_DEPTH', 2))
+)
+
+DOCS_WORKERS = int(os.environ.get('DOCS_WORKERS', 4))
+
+# Bounds on upstream work started from requests: a burst beyond a lane's limit queues briefly (FIFO, a
+# bounded number of places, one per session), and anything more is answered at once with a retry-after
+admission = AdmissionController([
+    Lane('generation',
+         limit=int(os.environ.get('GENERATION_CONCURRENCY', 8)),
+         queue_size=int(os.environ.get('GENERATION_QUEUE', 16)),
+         max_wait=float(os.environ.get('GENERATION_MAX_WAIT', 5))),
+    Lane('docs', limit=DOCS_WORKERS, queue_size=int(os.environ.get('DOCS_QUEUE', 32)), per_session=2)
+])
+
+session_store = create_session_store()
+documentation_jobs = DocumentationJobs(max_workers=DOCS_WORKERS, lane=admission.lane('docs'))
+
+@app.before_request
+def start_trace():
+    g.started = time.perf_counter()
+    g.trace_token = current_trace.set([])
+
+@app.after_request
+def finish_trace(response):
+    elapsed = time.perf_counter() - g.started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.observe(elapsed, route=route, method=request.method, status=response.status_code)
+    spans = current_trace.get() or []
+    current_trace.reset(g.trace_token)
+    trace_log.info(json.dumps({
+        'route': route,
+        'method': request.method,
+        'status': response.status_code,
+        'ms': round(elapsed * 1000, 2),
+        'quiz_id': session.get('quiz_id'),
+        'spans': spans
+    }))
+    return response
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def load_quiz():
+    """
+    Look up the quiz for the opaque id held in the cookie session.
+    """
+    quiz_id = session.get('quiz_id')
+    return session_store.load(quiz_id) if quiz_id else None
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -37,47 +86,126 @@ def index():
         num_questions = int(request.form['num_questions'])
         difficulty = request.form['difficulty']
         topic = request.form['topic']
-        quiz = Quiz(num_questions, difficulty, topic)
-        session['quiz'] = serialize_quiz(quiz)
+        adaptive = request.form.get('adaptive') == 'on'
+        quiz = Quiz(num_questions, difficulty, topic, adaptive=adaptive)
+        previous = load_quiz()
+        if adaptive and previous is not None and previous.adaptive:
+            # Keep the user's Leitner boxes from their last adaptive quiz
+            quiz.scheduler = LeitnerScheduler.from_dict(previous.scheduler.to_dict(), topic)
+        if 'quiz_id' in session:
+            prefetcher.cancel(session['quiz_id'])
+            session_store.delete(session['quiz_id'])
+        session['quiz_id'] = session_store.create(quiz)
+        prefetch(session['quiz_id'], quiz)
         return redirect(url_for('question'))
     return render_template('index.html')
 
-def generate_next_question(quiz):
-    new_question = quiz.generate_next_question()
+STREAM_QUESTIONS = os.environ.get('STREAM_QUESTIONS', '1') == '1'
+QUESTION_UNAVAILABLE = "A valid question could not be generated right now. Please try again."
+QUESTION_BUSY = "Lots of people are taking quizzes right now."
+
+def busy_response(busy):
+    response = jsonify({'question': None, 'error': QUESTION_BUSY, 'retry_after': busy.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(busy.retry_after)
+    return response
+
+def lookup_documentation(topic, objective, sub_objective):
+    """
+    Documentation fields for a graded answer: the cached link and snippet, a doc_url to poll while the
+    search runs, or doc_retry_after and doc_retry_url when the docs lane is busy. Returns (hit, fields).
+    """
+    search_query = documentation_query(topic, objective, sub_objective)
+    hit, (doc_link, doc_snippet) = get_cached_documentation(search_query, sub_objective)
+    fields = {'doc_link': doc_link, 'doc_snippet': doc_snippet}
+    if not hit:
+        # Grade now and let the page poll for the documentation once the search finishes
+        try:
+            job_id = documentation_jobs.submit(search_query, sub_objective, session['quiz_id'])
+            fields['doc_url'] = url_for('documentation', job_id=job_id)
+        except Busy as busy:
+            fields['doc_retry_after'] = busy.retry_after
+            fields['doc_retry_url'] = url_for('retry_documentation')
+    return hit, fields
+
+def generate_next_question(quiz, allow_generation=True):
+    """
+    Take the next question from the session's prefetch buffer, generating it inline only on a miss,
+    and start prefetching the ones after it. Without allow_generation a miss is only looked up in the bank.
+    Raises admission.Busy when the generation lane is full and the bank has nothing for the slot.
+    """
+    quiz_id = session['quiz_id']
+    new_question = prefetcher.pop(quiz_id)
+    if new_question is not None and not quiz.accept_question(new_question):
+        new_question = None
+    prefetched = new_question is not None
+    if new_question is None:
+        if not allow_generation:
+            new_question = quiz.draw_next_question()
+        else:
+            try:
+                with admission.lane('generation').admit(quiz_id):
+                    new_question = quiz.generate_next_question()
+            except Busy:
+                # A stored question needs no upstream call, so serve one if the bank has it
+                new_question = quiz.draw_next_question()
+                if new_question is None:
+                    prefetch(quiz_id, quiz)
+                    raise
     if new_question:
-        question_queue.put(new_question)
+        serve_question(quiz_id, quiz, new_question, 'prefetch' if prefetched else new_question.source or 'llm')
+    prefetch(quiz_id, quiz)
+    return new_question
+
+def prefetch(quiz_id, quiz):
+    """
+    Start prefetching the quiz's next questions. Their slots are drawn from the quiz loaded for this
+    request, so its scheduler is stored again to keep them from being handed out twice.
+    """
+    if prefetcher.schedule(quiz_id, quiz):
+        session_store.save_scheduler(quiz_id, quiz)
+
+def serve_question(quiz_id, quiz, new_question, path):
+    """
+    Append a question to the quiz and its stored session, noting how it was obtained.
+    """
+    SERVING_PATHS.inc(path=path)
+    annotate(serving_path=path)
+    quiz.questions.append(new_question)
+    session_store.append_question(quiz_id, quiz, new_question)
 
 @app.route('/question', methods=['GET', 'POST'])
 def question():
-    if 'quiz' not in session:
+    quiz = load_quiz()
+    if quiz is None:
         return redirect(url_for('index'))
     
-    quiz = deserialize_quiz(session['quiz'])
-    
     if request.method == 'POST':
+        if quiz.get_current_question() is None:
+            return jsonify({'error': "There is no question to answer. Please reload the page."}), 409
         user_answer = request.form.getlist('answer')
         user_answer = [int(ans) for ans in user_answer]
+        answers_before = len(quiz.user_performance)
         is_correct, partially_correct = quiz.check_answer(user_answer)
         
         feedback = quiz.get_feedback()
-        logging.debug(f"Raw feedback: {feedback}")
-        
-        search_query = f"{feedback.get('topic', '')} {feedback.get('objective', '')} {feedback.get('sub_objective', '')}"
-        doc_link, doc_snippet = get_official_documentation(search_query, feedback.get('sub_objective', ''))
+        hit, doc = lookup_documentation(feedback.get('topic', ''), feedback.get('objective', ''), feedback.get('sub_objective', ''))
         
         feedback_data = {
             'is_correct': is_correct,
             'partially_correct': partially_correct,
             'correct_answer': feedback['correct_answer'],
             'explanation': feedback['explanation'],
-            'doc_link': doc_link,
-            'doc_snippet': doc_snippet
+            **doc
         }
-        
-        logging.debug(f"Prepared feedback data: {feedback_data}")
+        annotate(is_correct=is_correct, partially_correct=partially_correct, doc_cached=hit)
         
         quiz.current_question += 1
-        session['quiz'] = serialize_quiz(quiz)
+        if len(quiz.user_performance) > answers_before:
+            session_store.record_answer(session['quiz_id'], quiz, quiz.user_performance[-1])
+        if quiz.current_question < quiz.num_questions:
+            # Prefetch while the user reads the feedback
+            prefetch(session['quiz_id'], quiz)
         
         return jsonify({
             'feedback': feedback_data,
@@ -86,46 +214,143 @@ def question():
         })
     
     # GET request
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    stream_url = None
+    retry_after = None
     if not quiz.questions or quiz.current_question >= len(quiz.questions):
-        # Generate a new question if needed
-        new_question = quiz.generate_next_question()
-        if new_question:
-            quiz.questions.append(new_question)
-            session['quiz'] = serialize_quiz(quiz)
+        # Generate a new question if needed; a full page can stream it instead of waiting
+        streaming = STREAM_QUESTIONS and not is_ajax
+        try:
+            if not generate_next_question(quiz, allow_generation=not streaming) and streaming:
+                stream_url = url_for('question_stream')
+        except Busy as busy:
+            if is_ajax:
+                return busy_response(busy)
+            retry_after = busy.retry_after
     
     question_data = quiz.get_current_question()
+    question_data = question_data.to_dict() if question_data else None
+    error = None
+    if question_data is None and stream_url is None:
+        error = QUESTION_BUSY if retry_after else QUESTION_UNAVAILABLE
     
     # Check if it's an AJAX request
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({'question': question_data})
+    if is_ajax:
+        return jsonify({'question': question_data, 'error': error}), 503 if error else 200
     else:
-        return render_template('question.html', quiz=quiz, question=question_data, chr=chr)
+        return render_template('question.html', quiz=quiz, question=question_data, stream_url=stream_url, error=error,
+                               retry_after=retry_after, chr=chr), 503 if retry_after else 200
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/question/stream')
+def question_stream():
+    """
+    Server-Sent Events stream of the current question: the question text and options as soon as the
+    model has produced them, then a 'complete' event once the full question is stored. The stream runs
+    under the generation guard's deadline and breaker; a stored question is sent instead when it fails.
+    """
+    quiz = load_quiz()
+    if quiz is None:
+        return redirect(url_for('index'))
+    quiz_id = session['quiz_id']
+
+    def events():
+        current = quiz.get_current_question()
+        if current is not None:
+            yield sse_event('question', current.to_dict())
+            yield sse_event('complete', {})
+            return
+        guard = get_guard()
+        try:
+            with admission.lane('generation').admit(quiz_id):
+                # The slot comes from the quiz's scheduler, and is only drawn once admitted so a rejection does not use it up
+                question_type, selection = quiz.next_slot()
+                new_question = None
+                fallback_path = 'breaker_open'
+                if guard.breaker.allow():
+                    fallback_path = 'fallback'
+                    generate = lambda: stream_question(quiz.difficulty, quiz.topic, question_type=question_type, selection=selection)
+                    for event, data in guard.stream(generate):
+                        if event == 'complete':
+                            new_question = quiz.served_question(data, 'stream')
+                            if not quiz.accept_question(new_question):
+                                new_question = None
+                            break
+                        if event in ('error', 'deadline'):
+                            break
+                        yield sse_event(event, data)
+                if new_question is None:
+                    # Serve, or replace what was shown with, a stored question for the same sub-objective
+                    new_question = quiz.served_question(quiz.fallback_question(selection, question_type), fallback_path)
+                    if new_question is None:
+                        yield sse_event('error', {'message': QUESTION_UNAVAILABLE})
+                        return
+                    yield sse_event('question', new_question.to_dict())
+                if quiz.get_current_question() is None:
+                    serve_question(quiz_id, quiz, new_question, new_question.source)
+                    prefetch(quiz_id, quiz)
+                yield sse_event('complete', {})
+        except Busy as busy:
+            yield sse_event('busy', {'message': QUESTION_BUSY, 'retry_after': busy.retry_after})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
 
 @app.route('/next_question', methods=['GET'])
 def next_question():
-    if 'quiz' not in session:
+    quiz = load_quiz()
+    if quiz is None:
         return redirect(url_for('index'))
     
-    quiz = deserialize_quiz(session['quiz'])
-    
     if quiz.current_question >= quiz.num_questions:
         return jsonify({'redirect': url_for('result')})
     
     if not quiz.questions or quiz.current_question >= len(quiz.questions):
-        new_question = quiz.generate_next_question()
-        if new_question:
-            quiz.questions.append(new_question)
-            session['quiz'] = serialize_quiz(quiz)
+        try:
+            generate_next_question(quiz)
+        except Busy as busy:
+            return busy_response(busy)
     
     question_data = quiz.get_current_question()
-    return jsonify({'question': question_data})
+    if question_data is None:
+        return jsonify({'question': None, 'error': QUESTION_UNAVAILABLE}), 503
+    return jsonify({'question': question_data.to_dict()})
+
+@app.route('/documentation/<job_id>')
+def documentation(job_id):
+    doc = documentation_jobs.result(job_id)
+    if doc is None:
+        return jsonify({'status': 'unknown'}), 404
+    if doc == 'pending':
+        return jsonify({'status': 'pending'})
+    doc_link, doc_snippet = doc
+    return jsonify({'status': 'ready', 'doc_link': doc_link, 'doc_snippet': doc_snippet})
+
+@app.route('/documentation', methods=['POST'])
+def retry_documentation():
+    """
+    Look up the documentation for the last answered question again, after the docs lane was busy.
+    """
+    quiz = load_quiz()
+    if quiz is None or not 0 < quiz.current_question <= len(quiz.questions):
+        return jsonify({'status': 'unknown'}), 404
+    answered = quiz.questions[quiz.current_question - 1]
+    # The same fallbacks as Quiz.get_feedback, so the lookup hits the cache entry grading would have used
+    _, doc = lookup_documentation(answered.topic or "Unknown", answered.objective or "Unknown", answered.sub_objective or "Unknown")
+    if 'doc_retry_after' in doc:
+        response = jsonify(doc)
+        response.status_code = 503
+        response.headers['Retry-After'] = str(doc['doc_retry_after'])
+        return response
+    return jsonify(doc)
 
 @app.route('/result')
 def result():
-    if 'quiz' not in session:
+    quiz = load_quiz()
+    if quiz is None:
         return redirect(url_for('index'))
-    
-    quiz = deserialize_quiz(session['quiz'])
+    prefetcher.cancel(session['quiz_id'])
     
     return render_template('result.html', quiz=quiz)
 
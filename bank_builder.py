@@ -0,0 +1,216 @@
+# bank_builder.py
+"""
+Fill the question bank offline: a target number of questions for every sub-objective x difficulty x
+question type, generated in batches by a bounded worker pool under requests-per-minute and
+tokens-per-minute limits. Every batch is checkpointed to a JSONL file, so rerunning the same command
+after an interruption only generates what is still missing.
+
+    python bank_builder.py --per-slot 3 --concurrency 4 --rpm 60 --tpm 90000
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DIFFICULTIES = ['easy', 'medium', 'hard']
+# Rough size of one generated question, used to reserve tokens before the response reports real usage
+COMPLETION_TOKENS_PER_QUESTION = 350
+
+class TokenBucket:
+    """
+    Allows `rate` units per minute with bursts up to one minute's worth. acquire() blocks until the
+    amount is available; settle() corrects an estimate once the real amount is known and may leave the
+    bucket in debt, which later callers wait out.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate / 60)
+        self._updated = now
+
+    def acquire(self, amount):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) * 60 / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def settle(self, difference):
+        with self._lock:
+            self._refill()
+            self._tokens -= difference
+
+
+class Checkpoint:
+    """
+    Append-only JSONL record of finished batches: the cell they filled, what was stored and the tokens used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stored = Counter()
+        self.attempted = Counter()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self._count(json.loads(line))
+
+    def _count(self, entry):
+        key = tuple(entry['cell'])
+        self.stored[key] += len(entry['bank_ids'])
+        self.attempted[key] += entry['requested']
+        self.prompt_tokens += entry.get('prompt_tokens', 0)
+        self.completion_tokens += entry.get('completion_tokens', 0)
+
+    def record(self, entry):
+        with self._lock:
+            self._count(entry)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+
+def plan_batches(slots, difficulties, question_types, per_slot, batch_size, checkpoint, max_attempts):
+    """
+    Split what is still missing in every (slot, difficulty, question type) cell into batches.
+    A cell stops being planned once it has used max_attempts times its target, e.g. when the
+    bank keeps rejecting near-duplicates for it. Batches whose call failed are not checkpointed,
+    so an upstream outage does not use up the budget.
+    """
+    batches = []
+    for slot in slots:
+        for difficulty in difficulties:
+            for question_type in question_types:
+                cell = (slot, difficulty, question_type)
+                missing = per_slot - checkpoint.stored[cell]
+                budget = per_slot * max_attempts - checkpoint.attempted[cell]
+                missing = min(missing, budget)
+                while missing > 0:
+                    size = min(batch_size, missing)
+                    batches.append((cell, size))
+                    missing -= size
+    return batches
+
+def build_bank(args):
+    from quiz_generator import generate_questions, QUESTION_TYPES
+    from scheduler import SLOTS, TOPIC_SLOTS
+
+    question_types = args.types or QUESTION_TYPES
+    checkpoint = Checkpoint(args.checkpoint)
+    batches = plan_batches(TOPIC_SLOTS[args.topic], args.difficulties, question_types, args.per_slot,
+                           args.batch_size, checkpoint, args.max_attempts)
+    total = sum(size for _, size in batches)
+    logging.info(f"{total} questions to generate in {len(batches)} batches "
+                 f"({sum(checkpoint.stored.values())} already stored by earlier runs)")
+    if not batches:
+        return checkpoint
+
+    requests = TokenBucket(args.rpm)
+    tokens = TokenBucket(args.tpm)
+    progress = {'stored': 0, 'requested': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+    progress_lock = threading.Lock()
+    started = time.monotonic()
+
+    def run(cell, size):
+        slot, difficulty, question_type = cell
+        estimate = args.prompt_tokens_estimate + size * COMPLETION_TOKENS_PER_QUESTION
+        requests.acquire(1)
+        tokens.acquire(estimate)
+        usage = {}
+        questions = generate_questions(difficulty, SLOTS[slot][0], size, exam_code=args.exam, model=args.model,
+                                       slots=[(question_type, SLOTS[slot])] * size, batch_size=size, usage=usage)
+        used = usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
+        tokens.settle(used - estimate)
+        if usage.get('failed_calls'):
+            # No response, so nothing was learnt about the cell; leave it for the next run without using its budget
+            raise RuntimeError(f"no response for {size} questions of cell {cell}")
+        entry = {
+            'cell': list(cell),
+            'requested': size,
+            'bank_ids': [question['bank_id'] for question in questions if 'bank_id' in question],
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'completion_tokens': usage.get('completion_tokens', 0),
+            'finished_at': time.time()
+        }
+        checkpoint.record(entry)
+        return entry
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run, cell, size) for cell, size in batches]
+        for future in as_completed(futures):
+            try:
+                entry = future.result()
+            except Exception as e:
+                logging.error(f"Batch failed: {e}")
+                continue
+            with progress_lock:
+                progress['stored'] += len(entry['bank_ids'])
+                progress['requested'] += entry['requested']
+                progress['prompt_tokens'] += entry['prompt_tokens']
+                progress['completion_tokens'] += entry['completion_tokens']
+                elapsed = time.monotonic() - started
+                logging.info(
+                    f"{progress['requested']}/{total} requested, {progress['stored']} stored, "
+                    f"{progress['stored'] / elapsed * 60:.1f} questions/min, "
+                    f"{progress['prompt_tokens'] + progress['completion_tokens']} tokens, "
+                    f"${cost(progress['prompt_tokens'], progress['completion_tokens'], args):.4f}"
+                )
+    return checkpoint
+
+def cost(prompt_tokens, completion_tokens, args):
+    return (prompt_tokens * args.prompt_price + completion_tokens * args.completion_price) / 1_000_000
+
+def main(argv=None):
+    from providers import load_env
+    load_env()
+    from scheduler import TOPIC_SLOTS
+    from quiz_generator import QUESTION_TYPES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--exam', default='MS-900')
+    parser.add_argument('--topic', default='All Topics', choices=sorted(TOPIC_SLOTS))
+    parser.add_argument('--per-slot', type=int, default=3, help="Target questions per sub-objective, difficulty and type")
+    parser.add_argument('--difficulties', nargs='+', default=DIFFICULTIES, choices=DIFFICULTIES)
+    parser.add_argument('--types', nargs='+', choices=QUESTION_TYPES, help="Question types (default: all)")
+    parser.add_argument('--model', default='gpt-4o')
+    parser.add_argument('--batch-size', type=int, default=5, help="Questions per request")
+    parser.add_argument('--concurrency', type=int, default=4, help="Requests in flight at once")
+    parser.add_argument('--rpm', type=float, default=60, help="Requests per minute")
+    parser.add_argument('--tpm', type=float, default=90000, help="Tokens per minute")
+    parser.add_argument('--prompt-tokens-estimate', type=int, default=600, help="Tokens reserved per request for the prompt")
+    parser.add_argument('--max-attempts', type=int, default=3, help="Give up on a cell after this many times its target")
+    parser.add_argument('--prompt-price', type=float, default=2.5, help="USD per million prompt tokens")
+    parser.add_argument('--completion-price', type=float, default=10.0, help="USD per million completion tokens")
+    parser.add_argument('--checkpoint', default='bank_build.jsonl')
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    checkpoint = build_bank(args)
+    elapsed = time.monotonic() - started
+    print(f"Stored {sum(checkpoint.stored.values())} questions in total; "
+          f"{checkpoint.prompt_tokens + checkpoint.completion_tokens} tokens "
+          f"(${cost(checkpoint.prompt_tokens, checkpoint.completion_tokens, args):.4f}) across all runs; "
+          f"this run took {elapsed:.1f}s.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
@@ -0,0 +1,268 @@
+# bank_export.py
+"""
+Read-only export of the question bank for serving. The file is memory-mapped, so every worker process
+shares one page-cache copy and a draw touches only the few pages it reads:
+
+    header | cell table | fixed-width records | string pool
+
+Records are grouped by cell (syllabus slot id x difficulty x question type) and the cell table holds
+each cell's first record and record count, so a random question for a slot is two table lookups.
+Records point into a UTF-8 string pool for the question, option and explanation text; identical strings
+(e.g. 'True' and 'False') are stored once.
+
+    python bank_export.py export -o question_bank.qzb
+    python bank_export.py stats -i question_bank.qzb
+"""
+import os
+import sys
+import json
+import mmap
+import zlib
+import random
+import struct
+import logging
+import sqlite3
+import argparse
+import threading
+from records import Question
+from scheduler import SLOTS, slot_id
+from quiz_generator import QUESTION_TYPES
+
+DEFAULT_EXPORT_PATH = os.environ.get("QUIZZR_BANK_EXPORT", "question_bank.qzb")
+
+MAGIC = b'QZBANK01'
+DIFFICULTIES = ('easy', 'medium', 'hard')
+MAX_OPTIONS = 6
+
+# magic, exam code, syllabus checksum, slot count, record count, cell table, records and string pool offsets
+HEADER = struct.Struct('<8s16sIIIQQQ')
+# first record index, record count
+CELL = struct.Struct('<II')
+# bank id, slot id, type, difficulty, option count, answer mask, then (offset, length) of the question,
+# MAX_OPTIONS options and MAX_OPTIONS explanations in the string pool
+RECORD = struct.Struct('<IHBBBB' + 'II' * (1 + 2 * MAX_OPTIONS))
+
+def syllabus_checksum():
+    """
+    Changes whenever the syllabus (and so the meaning of slot ids) changes.
+    """
+    return zlib.crc32(json.dumps(SLOTS).encode('utf-8'))
+
+def cell_index(slot, difficulty, question_type):
+    return (slot * len(DIFFICULTIES) + difficulty) * len(QUESTION_TYPES) + question_type
+
+
+class StringPool:
+    def __init__(self):
+        self.data = bytearray()
+        self._offsets = {}
+
+    def add(self, text):
+        encoded = (text or '').encode('utf-8')
+        reference = self._offsets.get(encoded)
+        if reference is None:
+            reference = self._offsets[encoded] = (len(self.data), len(encoded))
+            self.data += encoded
+        return reference
+
+
+def export_bank(bank_path, output_path, exam_code="MS-900"):
+    """
+    Write every stored question of exam_code that fits the format to output_path. Questions outside the
+    syllabus, of unknown type or difficulty, or with more than MAX_OPTIONS options are skipped.
+    The file is written next to output_path and renamed over it, so processes that have the old
+    export mapped keep reading a consistent file. Returns (exported, skipped).
+    """
+    conn = sqlite3.connect(bank_path)
+    try:
+        rows = conn.execute(
+            "SELECT id, difficulty, question_type, data FROM questions WHERE exam_code = ? ORDER BY id", (exam_code,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    cells = [[] for _ in range(len(SLOTS) * len(DIFFICULTIES) * len(QUESTION_TYPES))]
+    skipped = 0
+    for bank_id, difficulty, question_type, data in rows:
+        question = Question.from_dict(json.loads(data))
+        if (not isinstance(question.slot, int) or difficulty not in DIFFICULTIES or question_type not in QUESTION_TYPES
+                or len(question.options) > MAX_OPTIONS or question.answer_mask >= 1 << MAX_OPTIONS):
+            skipped += 1
+            continue
+        question.bank_id = bank_id
+        cells[cell_index(question.slot, DIFFICULTIES.index(difficulty), QUESTION_TYPES.index(question_type))].append(question)
+
+    pool = StringPool()
+    table = bytearray()
+    records = bytearray()
+    count = 0
+    empty = (0, 0)
+    for cell in cells:
+        table += CELL.pack(count, len(cell))
+        for question in cell:
+            options = [pool.add(option) for option in question.options]
+            explanations = [pool.add(explanation) for explanation in question.explanations]
+            padding = [empty] * (MAX_OPTIONS - len(options))
+            references = [pool.add(question.question)] + options + padding + explanations + padding
+            records += RECORD.pack(
+                question.bank_id, question.slot, QUESTION_TYPES.index(question.question_type),
+                DIFFICULTIES.index(question.difficulty), len(question.options), question.answer_mask,
+                *(value for reference in references for value in reference)
+            )
+            count += 1
+
+    table_offset = HEADER.size
+    records_offset = table_offset + len(table)
+    pool_offset = records_offset + len(records)
+    temporary = f"{output_path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, exam_code.encode('utf-8'), syllabus_checksum(), len(SLOTS), count,
+                            table_offset, records_offset, pool_offset))
+        f.write(table)
+        f.write(records)
+        f.write(pool.data)
+    os.replace(temporary, output_path)
+    return count, skipped
+
+
+class MappedBank:
+    """
+    A memory-mapped export opened read-only. Questions are decoded one record at a time on draw.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        (magic, exam_code, checksum, slot_count, self.record_count,
+         self._table, self._records, self._pool) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a question bank export")
+        if checksum != syllabus_checksum() or slot_count != len(SLOTS):
+            raise ValueError(f"{path} was exported for a different syllabus")
+        self.exam_code = exam_code.rstrip(b'\0').decode('utf-8')
+
+    def cell(self, slot, difficulty, question_type):
+        """
+        Return (first record index, record count) for a slot id, difficulty and question type.
+        """
+        if difficulty not in DIFFICULTIES or question_type not in QUESTION_TYPES:
+            return 0, 0
+        index = cell_index(slot, DIFFICULTIES.index(difficulty), QUESTION_TYPES.index(question_type))
+        return CELL.unpack_from(self._map, self._table + index * CELL.size)
+
+    def _text(self, offset, length):
+        start = self._pool + offset
+        return str(self._view[start:start + length], 'utf-8')
+
+    def question(self, index):
+        """
+        Decode record index into a Question.
+        """
+        bank_id, slot, question_type, difficulty, option_count, mask, *references = RECORD.unpack_from(
+            self._map, self._records + index * RECORD.size
+        )
+        texts = [self._text(references[i], references[i + 1]) for i in range(0, len(references), 2)]
+        return Question(
+            question=texts[0],
+            options=tuple(texts[1:1 + option_count]),
+            explanations=tuple(texts[1 + MAX_OPTIONS:1 + MAX_OPTIONS + option_count]),
+            answer_mask=mask,
+            question_type=QUESTION_TYPES[question_type],
+            difficulty=DIFFICULTIES[difficulty],
+            slot=slot,
+            bank_id=bank_id
+        )
+
+    def draw(self, slot, difficulty, question_type, exclude_ids=()):
+        """
+        Return a random question for the cell whose bank id is not in exclude_ids, or None.
+        """
+        start, count = self.cell(slot, difficulty, question_type)
+        if not count:
+            return None
+        exclude_ids = set(exclude_ids)
+        first = random.randrange(count)
+        for step in range(count):
+            index = start + (first + step) % count
+            bank_id = struct.unpack_from('<I', self._map, self._records + index * RECORD.size)[0]
+            if bank_id not in exclude_ids:
+                return self.question(index)
+        return None
+
+    def stats(self):
+        """
+        Record counts per (difficulty, question type) across the syllabus.
+        """
+        counts = {}
+        for slot in range(len(SLOTS)):
+            for difficulty in DIFFICULTIES:
+                for question_type in QUESTION_TYPES:
+                    key = f"{difficulty}/{question_type}"
+                    counts[key] = counts.get(key, 0) + self.cell(slot, difficulty, question_type)[1]
+        return counts
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+
+
+_mapped = None
+_mapped_loaded = False
+_mapped_lock = threading.Lock()
+
+def get_mapped_bank(path=DEFAULT_EXPORT_PATH):
+    """
+    Return the process-wide mapped export, or None when there is no usable export file.
+    """
+    global _mapped, _mapped_loaded
+    if not _mapped_loaded:
+        with _mapped_lock:
+            if not _mapped_loaded:
+                if os.path.exists(path):
+                    try:
+                        _mapped = MappedBank(path)
+                        logging.info(f"Mapped {_mapped.record_count} exported questions from {path}")
+                    except (OSError, ValueError, struct.error) as e:
+                        logging.error(f"Not using question bank export {path}: {e}")
+                _mapped_loaded = True
+    return _mapped
+
+def draw_exported(selection, difficulty, question_type, exclude_ids=()):
+    """
+    Draw a question for a (topic, objective, sub_objective) selection from the export, or None.
+    """
+    bank = get_mapped_bank()
+    if bank is None:
+        return None
+    slot = slot_id(*selection)
+    if slot is None:
+        return None
+    return bank.draw(slot, difficulty, question_type, exclude_ids)
+
+def main(argv=None):
+    from question_bank import DEFAULT_BANK_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export = subparsers.add_parser('export', help="Write the SQLite question bank to a mapped export")
+    export.add_argument('-b', '--bank', default=DEFAULT_BANK_PATH)
+    export.add_argument('-o', '--output', default=DEFAULT_EXPORT_PATH)
+    export.add_argument('--exam', default='MS-900')
+    stats = subparsers.add_parser('stats', help="Show record counts of an export")
+    stats.add_argument('-i', '--input', default=DEFAULT_EXPORT_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        exported, skipped = export_bank(args.bank, args.output, args.exam)
+        print(f"Exported {exported} questions to {args.output} ({os.path.getsize(args.output)} bytes); skipped {skipped}.")
+    elif args.command == 'stats':
+        bank = MappedBank(args.input)
+        print(f"{bank.record_count} questions for {bank.exam_code}")
+        for key, count in bank.stats().items():
+            print(f"{key}: {count}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
@@ -0,0 +1,203 @@
+# benchmarks/load_test.py
+"""
+Drive full quiz sessions through app.py with many concurrent simulated users against stubbed LLM and
+documentation backends, and report throughput, per-route latency percentiles, cookie size and memory
+per session. Each run is appended as one JSON line to the results file.
+
+    python benchmarks/load_test.py --users 50 --sessions 200 --llm-latency 1.5 --docs-latency 2.0
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def lognormal(median, sigma):
+    """
+    Latency sampler with the given median (seconds) and log-space spread.
+    """
+    if median <= 0:
+        return lambda: 0
+    mu = math.log(median)
+    return lambda: random.lognormvariate(mu, sigma)
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def configure_environment(args, workdir):
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['LLM_CACHE_MODE'] = 'off'
+    os.environ['QUIZZR_QUESTION_BANK'] = os.path.join(workdir, 'bank.db')
+    os.environ['QUIZZR_DOC_CACHE'] = os.path.join(workdir, 'doc_cache.db')
+    os.environ['QUIZZR_SESSION_STORE'] = args.session_store
+    os.environ['QUIZZR_SESSION_DB'] = os.path.join(workdir, 'sessions.db')
+    os.environ['STREAM_QUESTIONS'] = '0'
+    os.environ.setdefault('DOCS_BACKEND', 'bing')
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.busy = defaultdict(int)
+        self.cookie_sizes = []
+        self._lock = threading.Lock()
+
+    def timed(self, route, call):
+        start = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[route].append(elapsed)
+            if response.status_code == 503 and 'Retry-After' in response.headers:
+                self.busy[route] += 1
+            elif response.status_code >= 400:
+                self.errors[route] += 1
+        return response
+
+    def with_retries(self, route, call, attempts=5):
+        """
+        Make the request, waiting out Retry-After on busy replies like the page does.
+        """
+        for _ in range(attempts):
+            response = self.timed(route, call)
+            if response.status_code != 503 or 'Retry-After' not in response.headers:
+                break
+            time.sleep(int(response.headers['Retry-After']))
+        return response
+
+
+def run_session(app, recorder, args):
+    client = app.test_client()
+    ajax = {'X-Requested-With': 'XMLHttpRequest'}
+    recorder.timed('POST /', lambda: client.post('/', data={
+        'num_questions': str(args.questions), 'difficulty': 'medium', 'topic': 'All Topics'
+    }))
+    response = recorder.with_retries('GET /question', lambda: client.get('/question', headers=ajax))
+    question = response.get_json()['question']
+
+    for _ in range(args.questions):
+        if not question:
+            break
+        answer = str(random.randint(1, len(question['options'])))
+        response = recorder.timed('POST /question', lambda: client.post('/question', data={'answer': answer}, headers=ajax))
+        data = response.get_json()
+        doc_url = data['feedback'].get('doc_url')
+        while doc_url:
+            time.sleep(args.poll_interval)
+            doc = recorder.timed('GET /documentation', lambda: client.get(doc_url)).get_json()
+            if doc.get('status') != 'pending':
+                doc_url = None
+        time.sleep(args.think_time)
+        if data['is_last_question']:
+            break
+        response = recorder.with_retries('GET /next_question', lambda: client.get('/next_question', headers=ajax))
+        question = response.get_json().get('question')
+
+    cookie = client.get_cookie('session')
+    with recorder._lock:
+        recorder.cookie_sizes.append(len(cookie.value) if cookie else 0)
+    recorder.timed('GET /result', lambda: client.get('/result'))
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument('--sessions', type=int, default=100, help="Total quiz sessions to run")
+    parser.add_argument('--questions', type=int, default=10, help="Questions per quiz")
+    parser.add_argument('--llm-latency', type=float, default=1.0, help="Median LLM latency in seconds")
+    parser.add_argument('--llm-sigma', type=float, default=0.4)
+    parser.add_argument('--docs-latency', type=float, default=1.5, help="Median documentation search latency in seconds")
+    parser.add_argument('--docs-sigma', type=float, default=0.4)
+    parser.add_argument('--think-time', type=float, default=0.5, help="Seconds a user spends reading feedback")
+    parser.add_argument('--poll-interval', type=float, default=0.25)
+    parser.add_argument('--session-store', choices=['memory', 'sqlite'], default='memory')
+    parser.add_argument('--output', default=os.path.join(tempfile.gettempdir(), 'quizzr_load_results.jsonl'),
+                        help="JSON lines file each run is appended to")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='quizzr-bench-')
+    configure_environment(args, workdir)
+
+    logging.disable(logging.WARNING)
+    import app as quiz_app
+    import web_search
+    from llm_cache import FakeChatClient
+    import quiz_generator
+    from question_schema import validation_report
+    from quiz_generator import token_report
+
+    llm = FakeChatClient(latency=lognormal(args.llm_latency, args.llm_sigma))
+    quiz_generator.set_client(llm)
+    docs_latency = lognormal(args.docs_latency, args.docs_sigma)
+
+    def stub_search(query, topic, sub_objective=None, num_results=3):
+        time.sleep(docs_latency())
+        return [{'title': sub_objective, 'link': 'https://learn.microsoft.com/stub', 'snippet': query[:200], 'relevance': 1}]
+    web_search.search_microsoft_docs = stub_search
+
+    recorder = Recorder()
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        for future in [executor.submit(run_session, quiz_app.app, recorder, args) for _ in range(args.sessions)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    memory_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    total_requests = sum(len(values) for values in recorder.latencies.values())
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'params': vars(args),
+        'elapsed_s': round(elapsed, 3),
+        'sessions_per_s': round(args.sessions / elapsed, 3),
+        'requests_per_s': round(total_requests / elapsed, 3),
+        'llm_calls': llm.calls,
+        'question_validation': validation_report(),
+        'tokens': token_report(),
+        'admission': quiz_app.admission.stats(),
+        'cookie_bytes_max': max(recorder.cookie_sizes, default=0),
+        'memory_per_session_bytes': round((memory_after - memory_before) / args.sessions),
+        'routes': {
+            route: {
+                'count': len(values),
+                'errors': recorder.errors[route],
+                'busy': recorder.busy[route],
+                'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2)
+            }
+            for route, values in sorted(recorder.latencies.items())
+        }
+    }
+
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
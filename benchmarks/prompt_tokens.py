@@ -0,0 +1,191 @@
+# benchmarks/prompt_tokens.py
+"""
+Compare question prompts before and after the precompiled templates in prompts.py. The "before" layout
+is quiz_generator.py as it was at --baseline (by default the commit before prompts.py was added),
+loaded from git. For each question type it reports prompt tokens per question, how many leading tokens
+are identical across calls (and so can be served from a provider's prompt-prefix cache), the resulting
+effective input tokens, and the time to build a prompt. With --live, each layout is also sent to the
+configured LLM backend and latency and reported usage per question are measured.
+
+    python benchmarks/prompt_tokens.py --samples 50
+    OPENAI_API_KEY=... python benchmarks/prompt_tokens.py --live 5
+"""
+import os
+import sys
+import json
+import time
+import types
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# OpenAI caches prompt prefixes of at least 1024 tokens, in steps of CACHE_INCREMENT
+CACHE_INCREMENT = 128
+
+def token_counter():
+    """
+    Return (name, count) using tiktoken when installed, otherwise about four characters per token.
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding('o200k_base')
+        return 'o200k_base', lambda text: len(encoding.encode(text))
+    except Exception:
+        return 'chars/4', lambda text: len(text) // 4
+
+def baseline_revision():
+    added = subprocess.check_output(['git', 'log', '--diff-filter=A', '--format=%H', '--', 'prompts.py'], cwd=ROOT, text=True).split()
+    return f"{added[-1]}^" if added else 'HEAD'
+
+def load_baseline(revision):
+    """
+    Import quiz_generator.py as it was at revision, as a separate module.
+    """
+    source = subprocess.check_output(['git', 'show', f'{revision}:quiz_generator.py'], cwd=ROOT, text=True)
+    module = types.ModuleType('baseline_quiz_generator')
+    module.__file__ = os.path.join(ROOT, 'quiz_generator.py')
+    exec(compile(source, f'{revision}:quiz_generator.py', 'exec'), module.__dict__)
+    return module
+
+def layouts(baseline, exam_code):
+    import quiz_generator
+    from prompts import get_template, get_batch_template
+
+    def before(question_type, difficulty, selection):
+        return [
+            {"role": "system", "content": baseline.system_prompt(exam_code)},
+            {"role": "user", "content": baseline.generate_prompt(difficulty, question_type, None, exam_code, selection)[0]}
+        ]
+
+    def after(question_type, difficulty, selection):
+        return get_template(exam_code, question_type).messages(difficulty, selection)
+
+    # For 'batch' the selection is a list of (question_type, selection) slots
+    def batch_before(_, difficulty, slots):
+        return [
+            {"role": "system", "content": baseline.system_prompt(exam_code)},
+            {"role": "user", "content": baseline.generate_batch_prompt(difficulty, slots, exam_code)}
+        ]
+
+    def batch_after(_, difficulty, slots):
+        return get_batch_template(exam_code).messages(difficulty, slots)
+
+    single = {'before': before, 'after': after}
+    builders = {question_type: single for question_type in quiz_generator.QUESTION_TYPES}
+    builders['batch'] = {'before': batch_before, 'after': batch_after}
+    return builders
+
+def common_prefix(texts):
+    prefix = texts[0]
+    for text in texts[1:]:
+        length = 0
+        for a, b in zip(prefix, text):
+            if a != b:
+                break
+            length += 1
+        prefix = prefix[:length]
+    return prefix
+
+def cacheable(tokens, minimum):
+    if tokens < minimum:
+        return 0
+    return tokens - (tokens - minimum) % CACHE_INCREMENT
+
+def analyse(build, question_type, selections, difficulties, count_tokens, args, per_prompt=1):
+    started = time.perf_counter()
+    prompts = [build(question_type, difficulty, selection) for difficulty, selection in zip(difficulties, selections)]
+    build_us = (time.perf_counter() - started) / len(prompts) * 1e6
+    # Chat messages reach the model as one sequence, system message first
+    texts = ["\n".join(message['content'] for message in messages) for messages in prompts]
+    prompt_tokens = statistics.mean(count_tokens(text) for text in texts)
+    prefix_tokens = count_tokens(common_prefix(texts))
+    cached = min(cacheable(prefix_tokens, args.cache_minimum), prompt_tokens)
+    return {
+        'prompt_tokens_per_question': round(prompt_tokens / per_prompt, 1),
+        'shared_prefix_tokens': prefix_tokens,
+        'shared_prefix_share': round(prefix_tokens / prompt_tokens, 3),
+        'cacheable_tokens': cached,
+        'effective_prompt_tokens_per_question': round((prompt_tokens - cached + cached * args.cached_price) / per_prompt, 1),
+        'build_us': round(build_us, 2)
+    }
+
+def run_live(build, question_type, selections, difficulties, args, per_prompt=1):
+    from quiz_generator import get_client
+    client = get_client()
+    latencies, usage = [], {'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+    for difficulty, selection in list(zip(difficulties, selections))[:args.live]:
+        started = time.perf_counter()
+        response = client.chat.completions.create(model=args.model, messages=build(question_type, difficulty, selection), temperature=0.7)
+        latencies.append(time.perf_counter() - started)
+        reported = getattr(response, 'usage', None)
+        details = getattr(reported, 'prompt_tokens_details', None)
+        usage['prompt_tokens'] += getattr(reported, 'prompt_tokens', 0) or 0
+        usage['cached_tokens'] += getattr(details, 'cached_tokens', 0) or 0
+        usage['completion_tokens'] += getattr(reported, 'completion_tokens', 0) or 0
+    questions = len(latencies) * per_prompt
+    return {
+        'calls': len(latencies),
+        'latency_ms_p50': round(statistics.median(latencies) * 1000, 1),
+        **{f'{kind}_per_question': round(total / questions, 1) for kind, total in usage.items()}
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--exam', default='MS-900')
+    parser.add_argument('--samples', type=int, default=50, help="Prompts built per question type and layout")
+    parser.add_argument('--baseline', help="Git revision of the 'before' quiz_generator.py")
+    parser.add_argument('--cached-price', type=float, default=0.5, help="Price of a cached prompt token relative to an uncached one")
+    parser.add_argument('--cache-minimum', type=int, default=1024, help="Shortest prefix, in tokens, the provider caches")
+    parser.add_argument('--batch-size', type=int, default=5)
+    parser.add_argument('--live', type=int, default=0, help="Also send this many prompts per type and layout to the LLM backend")
+    parser.add_argument('--model', default='gpt-4o')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default=os.path.join(tempfile.gettempdir(), 'quizzr_prompt_results.jsonl'),
+                        help="JSON lines file each run is appended to")
+    args = parser.parse_args(argv)
+
+    from scheduler import SLOTS
+    from quiz_generator import QUESTION_TYPES
+    revision = args.baseline or baseline_revision()
+    builders = layouts(load_baseline(revision), args.exam)
+    tokenizer, count_tokens = token_counter()
+
+    rng = random.Random(args.seed)
+    selections = [rng.choice(SLOTS) for _ in range(args.samples)]
+    difficulties = [rng.choice(['easy', 'medium', 'hard']) for _ in range(args.samples)]
+    batches = [[(rng.choice(QUESTION_TYPES), rng.choice(SLOTS)) for _ in range(args.batch_size)] for _ in range(args.samples)]
+
+    results = {}
+    for question_type, layout_builders in builders.items():
+        inputs, per_prompt = (batches, args.batch_size) if question_type == 'batch' else (selections, 1)
+        results[question_type] = {}
+        for layout, build in layout_builders.items():
+            results[question_type][layout] = analyse(build, question_type, inputs, difficulties, count_tokens, args, per_prompt)
+            if args.live:
+                results[question_type][layout]['live'] = run_live(build, question_type, inputs, difficulties, args, per_prompt)
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'baseline': revision,
+        'tokenizer': tokenizer,
+        'params': vars(args),
+        'question_types': results
+    }
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,107 @@
+# benchmarks/startup.py
+"""
+Measure cold start: each target module is imported in a fresh interpreter several times, and the
+median import time, whole-process time and which heavy backends the import pulled in are reported.
+For the Flask app, the first request through the test client is timed too. Each run is appended as
+one JSON line to the results file.
+
+    python benchmarks/startup.py --repeat 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backends that should only be imported once something actually uses them
+HEAVY_MODULES = ('openai', 'selenium', 'webdriver_manager', 'dotenv')
+
+PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+first_request_ms = None
+if {first_request}:
+    response = {module}.app.test_client().get('/')
+    first_request_ms = (time.perf_counter() - imported) * 1000
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': first_request_ms,
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+    'modules': len(sys.modules)
+}}))
+"""
+
+def probe(module, first_request=False):
+    """
+    Import module in a new interpreter; returns its measurements plus the wall time of the whole process.
+    """
+    code = PROBE.format(module=module, first_request=first_request, heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    started = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT, env=env, text=True, stderr=subprocess.DEVNULL)
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+def slowest_imports(module, count):
+    """
+    The modules with the largest cumulative import time, from python -X importtime.
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=ROOT, capture_output=True, text=True)
+    timings = []
+    for line in completed.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                timings.append((int(cumulative) / 1000, name.strip()))
+    return [{'module': name, 'cumulative_ms': round(ms, 2)} for ms, name in sorted(timings, reverse=True)[:count]]
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', nargs='+', default=['app', 'main', 'bank_builder'], help="Modules to import")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument('--top', type=int, default=8, help="Slowest imports to list per target")
+    parser.add_argument('--output', default=os.path.join(tempfile.gettempdir(), 'quizzr_startup_results.jsonl'),
+                        help="JSON lines file each run is appended to")
+    args = parser.parse_args(argv)
+
+    targets = {}
+    for module in args.targets:
+        runs = [probe(module, first_request=module == 'app') for _ in range(args.repeat)]
+        targets[module] = {
+            'import_ms_p50': round(statistics.median(run['import_ms'] for run in runs), 2),
+            'process_ms_p50': round(statistics.median(run['process_ms'] for run in runs), 2),
+            'first_request_ms_p50': round(statistics.median(run['first_request_ms'] for run in runs), 2)
+                                    if module == 'app' else None,
+            'modules': runs[-1]['modules'],
+            'heavy_modules': runs[-1]['heavy_modules'],
+            'slowest_imports': slowest_imports(module, args.top)
+        }
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'params': vars(args),
+        'python': sys.version.split()[0],
+        'targets': targets
+    }
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,209 @@
+# bing_search.py
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote_plus
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from web_search import calculate_relevance
+from metrics import REGISTRY, timed
+
+SEARCH_SECONDS = REGISTRY.histogram('quizzr_docs_search_seconds', "Documentation search phases.", ['phase'])
+
+def setup_driver(driver_path=None):
+    """
+    Start a headless Chrome. The chromedriver binary comes from driver_path, then CHROMEDRIVER_PATH,
+    and is otherwise downloaded by webdriver_manager.
+    """
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    options.add_argument("--log-level=3")
+    options.add_argument('--disable-dev-shm-usage')
+    driver_path = driver_path or os.environ.get('CHROMEDRIVER_PATH') or ChromeDriverManager().install()
+    return webdriver.Chrome(service=Service(driver_path), options=options)
+
+class DriverPool:
+    """
+    Bounded, thread-safe pool of warm headless Chrome instances.
+
+    Drivers are health-checked when handed out and recycled after max_uses searches or when a search
+    breaks them. When every driver is busy, callers wait up to acquire_timeout instead of starting more browsers.
+    """
+
+    def __init__(self, size=2, max_uses=50, acquire_timeout=30, driver_factory=setup_driver):
+        self.size = size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._driver_factory = driver_factory
+        self._idle = []
+        self._uses = {}
+        self._created = 0
+        # Notified whenever a driver is returned or a slot frees up, so waiters can take or create one
+        self._available = threading.Condition(threading.Lock())
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._available:
+                while not self._idle and self._created >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._available.wait(remaining):
+                        raise TimeoutError(f"No browser available within {self.acquire_timeout}s")
+                driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    self._created += 1
+            if driver is None:
+                driver = self._create()
+            if self._is_healthy(driver):
+                return driver
+            self._discard(driver)
+
+    def release(self, driver, broken=False):
+        with self._available:
+            self._uses[driver] = self._uses.get(driver, 0) + 1
+            if not broken and self._uses[driver] < self.max_uses:
+                self._idle.append(driver)
+                self._available.notify()
+                return
+        self._discard(driver)
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        broken = False
+        try:
+            yield driver
+        except WebDriverException as e:
+            broken = not isinstance(e, TimeoutException)
+            raise
+        finally:
+            self.release(driver, broken)
+
+    def close_all(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._discard(driver)
+
+    def _create(self):
+        """
+        Start a browser for a slot the caller has already reserved in _created.
+        """
+        try:
+            with timed(SEARCH_SECONDS, span='docs', phase='driver_startup'):
+                driver = self._driver_factory()
+        except Exception:
+            self._free_slot()
+            raise
+        with self._available:
+            self._uses[driver] = 0
+        return driver
+
+    def _is_healthy(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        with self._available:
+            self._uses.pop(driver, None)
+        self._free_slot()
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error shutting down browser: {e}")
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+driver_pool = DriverPool(
+    size=int(os.environ.get('DRIVER_POOL_SIZE', 2)),
+    max_uses=int(os.environ.get('DRIVER_MAX_USES', 50)),
+    acquire_timeout=float(os.environ.get('DRIVER_ACQUIRE_TIMEOUT', 30))
+)
+atexit.register(driver_pool.close_all)
+
+def search_bing(query, topic, sub_objective=None, num_results=3):
+    """
+    Return the top results for the query, an empty list when Bing found nothing, or None when the
+    search itself failed (no driver in time, a browser crash, a network error).
+    """
+    # Enhance the search query with MS-900 specific terms
+    ms900_terms = ["MS-900", "Microsoft 365 Fundamentals"]
+    enhanced_query = f"{query} {' '.join(ms900_terms)}"
+    
+    if topic:
+        enhanced_query += f" {topic}"
+    if sub_objective:
+        enhanced_query += f" {sub_objective}"
+    
+    encoded_query = quote_plus(f"site:microsoft.com {enhanced_query}")
+    url = f"https://www.bing.com/search?q={encoded_query}"
+    
+    try:
+        with driver_pool.driver() as driver:
+            return _search_results(driver, url, query, topic, sub_objective, num_results)
+    except Exception as e:
+        logging.error(f"Error during Microsoft Docs search: {e}")
+        return None
+
+def _search_results(driver, url, query, topic, sub_objective, num_results):
+    with timed(SEARCH_SECONDS, span='docs', phase='page_load'):
+        driver.get(url)
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "b_algo")))
+    
+    with timed(SEARCH_SECONDS, span='docs', phase='result_parse'):
+        results = _parse_results(driver, query, topic, sub_objective)
+    
+    # Sort results by relevance and return top matches
+    sorted_results = sorted(results, key=lambda x: x['relevance'], reverse=True)
+    return sorted_results[:num_results]
+
+def _parse_results(driver, query, topic, sub_objective):
+    results = []
+    for result in driver.find_elements(By.CLASS_NAME, "b_algo"):
+        try:
+            title_element = WebDriverWait(result, 5).until(
+                EC.presence_of_element_located((By.TAG_NAME, "h2"))
+            ).find_element(By.TAG_NAME, "a")
+            
+            link = title_element.get_attribute("href")
+            title = title_element.text
+            
+            snippet = extract_snippet(result)
+            
+            if link and 'microsoft.com' in link:
+                relevance_score = calculate_relevance(title, snippet, query, topic, sub_objective)
+                results.append({
+                    'title': title,
+                    'link': link,
+                    'snippet': snippet,
+                    'relevance': relevance_score
+                })
+        except (TimeoutException, NoSuchElementException) as e:
+            logging.warning(f"Error processing a search result: {e}")
+            continue
+    return results
+
+def extract_snippet(result):
+    snippet_classes = ["b_caption", "b_snippet", "b_richSnippet"]
+    for class_name in snippet_classes:
+        try:
+            return result.find_element(By.CLASS_NAME, class_name).text
+        except NoSuchElementException:
+            continue
+    return "No snippet available"
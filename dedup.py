@@ -0,0 +1,96 @@
+# dedup.py
+import re
+import zlib
+import random
+import threading
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+def question_text(question_data):
+    """
+    Text used to fingerprint a question: the stem plus its options.
+    """
+    return fingerprint_text(question_data.get('question', ''), question_data.get('options') or [])
+
+def fingerprint_text(question, options):
+    return f"{question} {' '.join(map(str, options))}"
+
+def shingles(text, size=3):
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of word shingles, bucketed with LSH banding and kept separately per key
+    (normally the sub-objective). Checking or inserting a question costs O(1) expected bucket lookups.
+    """
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.7, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = random.Random(seed)
+        self._permutations = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._buckets = {}
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def signature(self, text):
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)]
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        )
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _find_duplicate(self, key, signature):
+        buckets = self._buckets.get(key)
+        if not buckets:
+            return None
+        signatures = self._signatures[key]
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for entry in buckets.get(band_key, ()):
+                if entry in seen:
+                    continue
+                seen.add(entry)
+                other = signatures[entry]
+                similarity = sum(1 for x, y in zip(signature, other) if x == y) / self.num_perm
+                if similarity >= self.threshold:
+                    return entry
+        return None
+
+    def find_duplicate(self, key, text):
+        """
+        Return the id of a stored near-duplicate of text under key, or None.
+        """
+        signature = self.signature(text)
+        with self._lock:
+            return self._find_duplicate(key, signature)
+
+    def add(self, key, text, entry_id=None):
+        """
+        Insert text under key unless a near-duplicate is already stored. Returns True if it was added.
+        """
+        signature = self.signature(text)
+        with self._lock:
+            if self._find_duplicate(key, signature) is not None:
+                return False
+            signatures = self._signatures.setdefault(key, {})
+            if entry_id is None:
+                entry_id = len(signatures)
+            signatures[entry_id] = signature
+            buckets = self._buckets.setdefault(key, {})
+            for band_key in self._band_keys(signature):
+                buckets.setdefault(band_key, []).append(entry_id)
+            return True
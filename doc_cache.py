@@ -0,0 +1,143 @@
+# doc_cache.py
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.environ.get("QUIZZR_DOC_CACHE", "doc_cache.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doc_cache (
+    key TEXT PRIMARY KEY,
+    link TEXT,
+    snippet TEXT,
+    expires_at REAL NOT NULL
+);
+"""
+
+class DocCache:
+    """
+    Two-tier cache of documentation lookups: an in-memory LRU in front of a SQLite file.
+    Empty results are cached too, with a shorter TTL, so a missing page is not searched for on every answer.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=256, ttl=7 * 24 * 3600, negative_ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Return (hit, (link, snippet)). A cached empty result is a hit with (None, None).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return True, value
+                del self._memory[key]
+
+            row = self._conn.execute("SELECT link, snippet, expires_at FROM doc_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[2] <= now:
+                return False, (None, None)
+            value = (row[0], row[1])
+            self._remember(key, value, row[2])
+            return True, value
+
+    def put(self, key, link, snippet):
+        ttl = self.ttl if link else self.negative_ttl
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, (link, snippet), expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO doc_cache (key, link, snippet, expires_at) VALUES (?, ?, ?, ?)",
+                (key, link, snippet, expires_at)
+            )
+            self._conn.commit()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._conn.execute("DELETE FROM doc_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+def cache_key(query, sub_objective):
+    return f"{query}\x1f{sub_objective or ''}"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_doc_cache():
+    """
+    Return the process-wide documentation cache, opening it on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DocCache()
+    return _cache
+
+def warm_up(force=False):
+    """
+    Look up the documentation for every sub-objective in the syllabus so answer feedback never waits on a search.
+    """
+    from quiz_generator import objectives
+    import providers
+    from web_search import documentation_query, get_official_documentation
+
+    if providers.backend_name('docs_search') == 'local':
+        logging.info("The local documentation index is not cached; nothing to warm.")
+        return 0
+    cache = get_doc_cache()
+    warmed = 0
+    for topic, topic_objectives in objectives.items():
+        for objective in topic_objectives:
+            for sub_objective in objective.get('sub_objectives', []):
+                query = documentation_query(topic, objective['objective'], sub_objective)
+                if force:
+                    cache.invalidate(cache_key(query, sub_objective))
+                elif cache.get(cache_key(query, sub_objective))[0]:
+                    continue
+                link, _ = get_official_documentation(query, sub_objective)
+                if not cache.get(cache_key(query, sub_objective))[0]:
+                    # The search failed and nothing was cached
+                    logging.warning(f"Could not look up documentation for '{sub_objective}'")
+                    continue
+                warmed += 1
+                logging.info(f"Warmed documentation for '{sub_objective}': {link or 'no result'}")
+    return warmed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the official-documentation lookup cache.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    warm = subparsers.add_parser('warm', help="Pre-populate the cache for every sub-objective")
+    warm.add_argument('--force', action='store_true', help="Refresh entries that are already cached")
+    args = parser.parse_args(argv)
+
+    if args.command == 'warm':
+        warmed = warm_up(force=args.force)
+        print(f"Looked up documentation for {warmed} sub-objectives.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
@@ -0,0 +1,68 @@
+# doc_jobs.py
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from web_search import get_official_documentation
+
+class DocumentationJobs:
+    """
+    Resolves documentation lookups in the background so grading can respond immediately.
+    Identical lookups already in flight share one job. With an admission lane, a new lookup takes a
+    place in its queue up front and submit() raises admission.Busy when there is none.
+    """
+
+    def __init__(self, max_workers=4, ttl=600, lane=None):
+        self.ttl = ttl
+        self.lane = lane
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='docs')
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, query, sub_objective, session_id=None):
+        key = (query, sub_objective)
+        with self._lock:
+            self._expire()
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                return job_id
+            ticket = self.lane.enqueue(session_id) if self.lane else None
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = (self._executor.submit(self._lookup, key, ticket), time.monotonic())
+            self._in_flight[key] = job_id
+        return job_id
+
+    def result(self, job_id):
+        """
+        Return None for an unknown job, 'pending' while running, or the (doc_link, doc_snippet) pair.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        future, _ = job
+        if not future.done():
+            return 'pending'
+        try:
+            return future.result()
+        except Exception as e:
+            logging.error(f"Error resolving documentation job {job_id}: {e}")
+            return None, None
+
+    def _lookup(self, key, ticket=None):
+        try:
+            if ticket is None:
+                return get_official_documentation(*key)
+            with self.lane.run(ticket):
+                return get_official_documentation(*key)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _expire(self):
+        now = time.monotonic()
+        for job_id, (future, created) in list(self._jobs.items()):
+            if future.done() and now - created > self.ttl:
+                del self._jobs[job_id]
@@ -0,0 +1,195 @@
+# llm_cache.py
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from types import SimpleNamespace
+
+MODES = ('off', 'cache', 'record', 'replay')
+
+class LLMCacheMiss(LookupError):
+    pass
+
+
+def make_response(content, usage=None):
+    """
+    Build an object shaped like an OpenAI chat completion from stored content.
+    """
+    usage = usage or {}
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(role='assistant', content=content), finish_reason='stop')],
+        usage=SimpleNamespace(
+            prompt_tokens=usage.get('prompt_tokens', 0),
+            completion_tokens=usage.get('completion_tokens', 0),
+            total_tokens=usage.get('total_tokens', 0)
+        )
+    )
+
+def make_stream(content, chunk_size=40):
+    """
+    Yield content as chat completion stream chunks.
+    """
+    for start in range(0, len(content), chunk_size):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[start:start + chunk_size]))])
+
+def usage_dict(usage):
+    if usage is None:
+        return {}
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+        'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+        'total_tokens': getattr(usage, 'total_tokens', 0) or 0
+    }
+
+def request_key(model, temperature, messages):
+    system = ''.join(m['content'] for m in messages if m['role'] == 'system')
+    user = ''.join(m['content'] for m in messages if m['role'] == 'user')
+    payload = json.dumps([model, temperature, system, user], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseStore:
+    """
+    SQLite file of raw completions keyed by request hash, stored as zlib-compressed JSON.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body BLOB NOT NULL, created_at REAL NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, content, usage):
+        body = zlib.compress(json.dumps({'content': content, 'usage': usage}).encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, created_at) VALUES (?, ?, ?)", (key, body, time.time())
+            )
+            self._conn.commit()
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner.create(**kwargs)
+
+
+class CachingChatClient:
+    """
+    Wraps a chat client with a response cache.
+
+    Modes: 'cache' serves stored responses and records misses, 'record' always calls upstream and
+    overwrites, 'replay' serves only stored responses and raises LLMCacheMiss instead of touching the
+    network, 'off' passes straight through.
+    """
+
+    def __init__(self, client, store, mode='cache'):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+        self.client = client
+        self.store = store
+        self.mode = mode
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def create(self, **kwargs):
+        if self.mode == 'off':
+            return self.client.chat.completions.create(**kwargs)
+
+        key = request_key(kwargs.get('model'), kwargs.get('temperature'), kwargs.get('messages', []))
+        stream = kwargs.get('stream', False)
+        if self.mode in ('cache', 'replay'):
+            cached = self.store.get(key)
+            if cached is not None:
+                return make_stream(cached['content']) if stream else make_response(cached['content'], cached['usage'])
+            if self.mode == 'replay':
+                raise LLMCacheMiss(f"No recorded response for request {key[:12]}")
+
+        response = self.client.chat.completions.create(**kwargs)
+        if stream:
+            return self._record_stream(key, response)
+        self.store.put(key, response.choices[0].message.content, usage_dict(getattr(response, 'usage', None)))
+        return response
+
+    def _record_stream(self, key, chunks):
+        parts = []
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        self.store.put(key, ''.join(parts), {})
+
+
+SINGLE_TYPE_PATTERN = re.compile(r"(?:Generate an? \w+|The following) (multiple-choice|true/false|multi-response) question")
+BATCH_SLOT_PATTERN = re.compile(r"^(\d+)\. (multiple-choice|true/false|multi-response) question", re.MULTILINE)
+
+def fake_question(question_type, number=1):
+    if question_type == 'true/false':
+        return {
+            'question': f"Stand-in true/false statement number {number}.",
+            'options': ['True', 'False'],
+            'correct_answer': 1,
+            'explanations': {'1': "This is correct.", '2': "This is incorrect."}
+        }
+    options = [f"Option {letter} for question {number}" for letter in 'ABCD']
+    question = {
+        'question': f"Stand-in {question_type} question number {number}?",
+        'options': options,
+        'explanations': {str(i): f"Explanation for option {i}." for i in range(1, len(options) + 1)}
+    }
+    if question_type == 'multi-response':
+        question['correct_answers'] = [1, 3]
+    else:
+        question['correct_answer'] = 2
+    return question
+
+
+class FakeChatClient:
+    """
+    Offline stand-in for the OpenAI client that answers question prompts with well-formed JSON.
+    latency is an optional callable returning the seconds to sleep per call.
+    """
+
+    def __init__(self, latency=None):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+        if self.latency:
+            time.sleep(self.latency())
+
+        prompt = ''.join(m['content'] for m in kwargs.get('messages', []) if m['role'] == 'user')
+        slots = BATCH_SLOT_PATTERN.findall(prompt)
+        if slots:
+            content = json.dumps([
+                dict(fake_question(question_type, f"{number}.{slot}"), slot=int(slot)) for slot, question_type in slots
+            ])
+        else:
+            match = SINGLE_TYPE_PATTERN.search(prompt)
+            content = json.dumps(fake_question(match.group(1) if match else 'multiple-choice', number))
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        if kwargs.get('stream'):
+            return make_stream(content)
+        return make_response(content, {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        })
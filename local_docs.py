@@ -0,0 +1,229 @@
+# local_docs.py
+import os
+import re
+import sys
+import gzip
+import json
+import math
+import logging
+import argparse
+import threading
+from html.parser import HTMLParser
+
+DEFAULT_INDEX_PATH = os.environ.get("QUIZZR_DOCS_INDEX", "docs_index.json.gz")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+MS900_PATTERN = re.compile(r"MS-900|Microsoft 365 Fundamentals", re.IGNORECASE)
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in including is it of on or such that the this to use using with".split()
+)
+SNIPPET_LENGTH = 300
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.title = ''
+        self.url = None
+        self.text = []
+        self._skip = 0
+        self._in_title = False
+        self._in_h1 = False
+        self._h1 = ''
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ('script', 'style', 'nav', 'footer'):
+            self._skip += 1
+        elif tag == 'title':
+            self._in_title = True
+        elif tag == 'h1':
+            self._in_h1 = True
+        elif tag == 'link' and attrs.get('rel') == 'canonical':
+            self.url = attrs.get('href')
+        elif tag == 'meta' and (attrs.get('name') == 'source_url' or attrs.get('property') == 'og:url'):
+            self.url = self.url or attrs.get('content')
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style', 'nav', 'footer'):
+            self._skip = max(self._skip - 1, 0)
+        elif tag == 'title':
+            self._in_title = False
+        elif tag == 'h1':
+            self._in_h1 = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            if self._in_h1:
+                self._h1 += data
+            self.text.append(data)
+
+def parse_html(content):
+    parser = _TextExtractor()
+    parser.feed(content)
+    text = ' '.join(' '.join(parser.text).split())
+    return (parser.title or parser._h1).strip(), parser.url, text
+
+def parse_markdown(content):
+    url = None
+    title = ''
+    front_matter = re.match(r"^---\n(.*?)\n---\n", content, re.DOTALL)
+    if front_matter:
+        for line in front_matter.group(1).splitlines():
+            key, _, value = line.partition(':')
+            if key.strip() == 'url':
+                url = value.strip().strip('"\'')
+            elif key.strip() == 'title':
+                title = value.strip().strip('"\'')
+        content = content[front_matter.end():]
+    if not title:
+        heading = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
+        title = heading.group(1).strip() if heading else ''
+    text = re.sub(r"[#*_`>\[\]]|\(https?://[^)]*\)", ' ', content)
+    return title, url, ' '.join(text.split())
+
+
+class LocalDocIndex:
+    """
+    Inverted index over a local documentation corpus, ranked with BM25 plus the
+    MS-900, topic and sub-objective boosts used by web_search.calculate_relevance.
+
+    Postings are flat lists of (doc_id, title_tf, body_tf) triples.
+    """
+
+    k1 = 1.2
+    b = 0.75
+    title_weight = 2
+
+    def __init__(self, docs=None, postings=None):
+        # docs: [url, title, snippet, length, mentions_ms900]
+        self.docs = docs or []
+        self.postings = postings or {}
+        self._prepare()
+
+    def _prepare(self):
+        count = len(self.docs)
+        self.avg_length = (sum(doc[3] for doc in self.docs) / count) if count else 0
+        self.idf = {
+            term: math.log(1 + (count - len(postings) // 3 + 0.5) / (len(postings) // 3 + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    @classmethod
+    def build(cls, directory):
+        index = cls()
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                extension = os.path.splitext(name)[1].lower()
+                if extension not in ('.html', '.htm', '.md', '.markdown'):
+                    continue
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    content = f.read()
+                title, url, text = parse_html(content) if extension in ('.html', '.htm') else parse_markdown(content)
+                index.add(url or os.path.relpath(path, directory), title or name, text)
+        index._prepare()
+        return index
+
+    def add(self, url, title, text):
+        doc_id = len(self.docs)
+        title_counts = {}
+        for token in tokenize(title):
+            title_counts[token] = title_counts.get(token, 0) + 1
+        body_tokens = tokenize(text)
+        body_counts = {}
+        for token in body_tokens:
+            body_counts[token] = body_counts.get(token, 0) + 1
+
+        for term in title_counts.keys() | body_counts.keys():
+            self.postings.setdefault(term, []).extend((doc_id, title_counts.get(term, 0), body_counts.get(term, 0)))
+
+        mentions_ms900 = bool(MS900_PATTERN.search(title + ' ' + text))
+        self.docs.append([url, title, text[:SNIPPET_LENGTH], len(body_tokens) + len(title_counts), mentions_ms900])
+
+    def search(self, query, topic=None, sub_objective=None, num_results=3):
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for i in range(0, len(postings), 3):
+                doc_id = postings[i]
+                tf = postings[i + 2] + self.title_weight * postings[i + 1]
+                norm = self.k1 * (1 - self.b + self.b * self.docs[doc_id][3] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        # Same boosts as calculate_relevance, read from the postings instead of substring scans
+        for terms in (topic, sub_objective):
+            for term in set(tokenize(terms or '')):
+                postings = self.postings.get(term, ())
+                for i in range(0, len(postings), 3):
+                    doc_id = postings[i]
+                    if doc_id in scores:
+                        scores[doc_id] += (1 if postings[i + 1] else 0) + (0.5 if postings[i + 2] else 0)
+        for doc_id in scores:
+            if self.docs[doc_id][4]:
+                scores[doc_id] += 2
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:num_results]
+        return [
+            {'title': self.docs[doc_id][1], 'link': self.docs[doc_id][0], 'snippet': self.docs[doc_id][2], 'relevance': score}
+            for doc_id, score in ranked
+        ]
+
+    def save(self, path):
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({'docs': self.docs, 'postings': self.postings}, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['docs'], data['postings'])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index(path=DEFAULT_INDEX_PATH):
+    """
+    Return the process-wide local index, loading it from disk on first use.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LocalDocIndex.load(path)
+    return _index
+
+def search_local_docs(query, topic, sub_objective=None, num_results=3):
+    return get_index().search(query, topic, sub_objective, num_results)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the offline documentation index.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Index a directory of HTML/Markdown pages")
+    build.add_argument('directory')
+    build.add_argument('-o', '--output', default=DEFAULT_INDEX_PATH)
+    search = subparsers.add_parser('search', help="Query an existing index")
+    search.add_argument('query')
+    search.add_argument('-i', '--index', default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        index = LocalDocIndex.build(args.directory)
+        index.save(args.output)
+        print(f"Indexed {len(index.docs)} pages ({len(index.postings)} terms) into {args.output}.")
+    elif args.command == 'search':
+        for result in LocalDocIndex.load(args.index).search(args.query, args.query):
+            print(f"{result['relevance']:.2f}  {result['title']}  {result['link']}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
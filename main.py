@@ -1,12 +1,56 @@
 # main.py
+from providers import load_env
 from quiz import Quiz
-from web_search import test_documentation_retrieval
+
+def ask_answer(question):
+    """
+    Read the option numbers for a question; multi-response answers are comma-separated.
+    """
+    prompt = "Your answers (comma-separated numbers): " if question.multi_response else "Your answer: "
+    while True:
+        try:
+            answer = [int(part) for part in input(prompt).replace(' ', '').split(',') if part]
+        except ValueError:
+            answer = []
+        if answer and all(1 <= number <= len(question.options) for number in answer):
+            return answer
+        print(f"Please enter numbers between 1 and {len(question.options)}.")
+
+def run_quiz(quiz):
+    while quiz.current_question < quiz.num_questions:
+        question = quiz.generate_next_question()
+        if question is None:
+            print("A valid question could not be generated right now. Please try again later.")
+            break
+        quiz.questions.append(question)
+
+        print(f"\nQuestion {quiz.current_question + 1} of {quiz.num_questions}: {question.question}")
+        for number, option in enumerate(question.options, 1):
+            print(f"{number}. {option}")
+
+        is_correct, partially_correct = quiz.check_answer(ask_answer(question))
+        feedback = quiz.get_feedback()
+        print("Correct!" if is_correct else "Partially correct." if partially_correct else "Incorrect.")
+        print(f"Correct answer: {feedback['correct_answer']}")
+        explanations = feedback['explanation'] if isinstance(feedback['explanation'], list) else [feedback['explanation']]
+        for explanation in explanations:
+            if explanation:
+                print(f"  {explanation}")
+        quiz.current_question += 1
+
+    print(f"\nScore: {quiz.score:g}/{len(quiz.user_performance)}")
+    for line in quiz.show_performance_summary():
+        print(line)
+    weak_areas = quiz.get_weak_areas()
+    if weak_areas:
+        print("Areas to review: " + "; ".join(weak_areas))
 
 def main():
+    load_env()
     print("Welcome to the MS-900 Quiz!")
     num_questions = int(input("How many questions would you like to answer? "))
     difficulty = input("Select difficulty level (easy, medium, hard): ").lower()
-    
+
     # List of topics
     topics = [
         'Describe cloud concepts',
@@ -15,24 +59,24 @@ def main():
         'Describe Microsoft 365 pricing, licensing, and support',
         'All Topics'
     ]
-    
+
     # Display topics to the user
     print("\nSelect a topic:")
     for idx, topic in enumerate(topics, 1):
         print(f"{idx}. {topic}")
-    
+
     # Get user selection
     topic_choice = int(input("Enter the number corresponding to your choice: "))
-    
+
     # Validate input
     if 1 <= topic_choice <= len(topics):
         selected_topic = topics[topic_choice - 1]
     else:
         print("Invalid selection. Defaulting to 'All Topics'.")
         selected_topic = 'All Topics'
-    
+
     quiz = Quiz(num_questions, difficulty, selected_topic)
-    quiz.start()
+    run_quiz(quiz)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
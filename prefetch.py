@@ -0,0 +1,114 @@
+# prefetch.py
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from quiz import Quiz
+
+class SessionBuffer:
+    def __init__(self):
+        self.ready = deque()
+        self.in_flight = 0
+        self.claimed_ids = set()
+        self.cancelled = False
+        self.last_access = time.monotonic()
+
+
+class Prefetcher:
+    """
+    Generates the next few questions of each quiz session in the background.
+
+    Every session gets its own buffer of ready questions. A bounded worker pool does the
+    generation and a global semaphore caps how many generation batches are in flight at once.
+    """
+
+    def __init__(self, max_workers=4, max_in_flight=8, depth=2, idle_timeout=1800):
+        self.depth = depth
+        self.idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, session_id, quiz):
+        """
+        Top up the session's buffer so up to `depth` questions are ready or being generated.
+        The slots are drawn from quiz's scheduler here, on the caller's thread; returns True if any
+        were, so the caller can store the scheduler.
+        """
+        with self._lock:
+            self._expire_idle()
+            buffer = self._buffers.setdefault(session_id, SessionBuffer())
+            buffer.last_access = time.monotonic()
+            remaining = quiz.num_questions - len(quiz.questions)
+            wanted = min(self.depth, remaining) - len(buffer.ready) - buffer.in_flight
+            pending = [q for q in quiz.questions if q] + list(buffer.ready)
+
+            if wanted <= 0:
+                return False
+            if not self._slots.acquire(blocking=False):
+                logging.debug(f"Prefetch capacity reached, deferring session {session_id}")
+                return False
+            # The missing questions are generated together so bank misses share one LLM call
+            buffer.in_flight += wanted
+            snapshot = Quiz(quiz.num_questions, quiz.difficulty, quiz.topic)
+            snapshot.questions = list(pending)
+            snapshot.scheduler = quiz.scheduler
+            # Drawn from the quiz the caller loaded, so a session store that keeps the scheduler sees them used
+            slots = [quiz.next_slot() for _ in range(wanted)]
+            self._executor.submit(self._generate, session_id, buffer, snapshot, slots)
+            return True
+
+    def pop(self, session_id):
+        """
+        Return the next ready question for the session, or None if nothing is buffered.
+        """
+        with self._lock:
+            buffer = self._buffers.get(session_id)
+            if buffer is None or not buffer.ready:
+                return None
+            buffer.last_access = time.monotonic()
+            return buffer.ready.popleft()
+
+    def cancel(self, session_id):
+        """
+        Drop the session's buffer. Generations already running are discarded when they finish.
+        """
+        with self._lock:
+            buffer = self._buffers.pop(session_id, None)
+            if buffer is not None:
+                buffer.cancelled = True
+
+    def _generate(self, session_id, buffer, snapshot, slots):
+        try:
+            if not buffer.cancelled:
+                self._buffer_questions(buffer, snapshot.generate_next_questions(len(slots), slots))
+        except Exception as e:
+            logging.error(f"Error prefetching questions for session {session_id}: {e}")
+        finally:
+            self._finish(buffer, len(slots))
+
+    def _buffer_questions(self, buffer, questions):
+        with self._lock:
+            if buffer.cancelled:
+                return
+            for question in questions:
+                bank_id = question.bank_id
+                if bank_id is not None:
+                    if bank_id in buffer.claimed_ids:
+                        continue
+                    buffer.claimed_ids.add(bank_id)
+                buffer.ready.append(question)
+
+    def _finish(self, buffer, count):
+        with self._lock:
+            buffer.in_flight -= count
+        self._slots.release()
+
+    def _expire_idle(self):
+        now = time.monotonic()
+        for session_id, buffer in list(self._buffers.items()):
+            if now - buffer.last_access > self.idle_timeout:
+                buffer.cancelled = True
+                del self._buffers[session_id]
@@ -0,0 +1,190 @@
+# prompts.py
+import json
+
+# Answer fields and option counts per question type, used by the single, batch and repair prompts
+BATCH_FORMATS = {
+    'multiple-choice': "4 options, 'correct_answer' is the integer index (starting from 1) of the single correct option",
+    'true/false': "options ['True', 'False'], 'correct_answer' is 1 for True or 2 for False",
+    'multi-response': "4-6 options where multiple options may be correct (say so in the question), 'correct_answers' is a list of integer indices starting from 1",
+}
+
+SINGLE_FORMATS = {
+    'multiple-choice': (
+        "The question has 4 options. Format the answer as a JSON object with these fields: "
+        "'question', 'options' (a list of options), "
+        "'correct_answer' (integer index starting from 1), "
+        "and 'explanations' (a dict mapping option numbers to explanations)."
+    ),
+    'true/false': (
+        "Format the answer as a JSON object with fields: "
+        "'question', 'options' (['True', 'False']), "
+        "'correct_answer' (1 for True, 2 for False), "
+        "and 'explanations' (dict mapping option numbers to explanations)."
+    ),
+    'multi-response': (
+        "The question has 4-6 options, where multiple options may be correct. Format the answer as a JSON object with fields: "
+        "'question', 'options' (list of options), "
+        "'correct_answers' (list of integer indices starting from 1), "
+        "and 'explanations' (dict mapping option numbers to explanations). "
+        "Be sure to specify that multiple options may be correct. In some cases you will specify the exact number of correct options in the question or requirements."
+    ),
+}
+
+SINGLE_EXAMPLES = {
+    'multiple-choice': {
+        'question': "Your company is planning to migrate to Microsoft Azure and Microsoft 365. You are required to identify a cloud service that allows for website hosting. Which of the following is the model you should choose?",
+        'options': ["Software as a Service (SaaS)", "Platform as a Service (PaaS)", "Infrastructure as a Service (IaaS)", "Container as a Service (CaaS)"],
+        'correct_answer': 2,
+        'explanations': {
+            '1': "Software as a Service (SaaS) provides access to software applications over the internet, but does not typically offer direct website hosting capabilities. Examples include Microsoft 365 apps.",
+            '2': "Platform as a Service (PaaS) is the correct choice for website hosting. It provides a platform allowing customers to develop, run, and manage applications without the complexity of building and maintaining the infrastructure. Azure App Service is an example of PaaS that supports website hosting.",
+            '3': "Infrastructure as a Service (IaaS) provides virtualized computing resources over the internet. While it can be used for website hosting, it requires more management and configuration compared to PaaS, making it less suitable for this specific requirement.",
+            '4': "Container as a Service (CaaS) is a cloud service model that allows users to upload, organize, run, scale, and manage containers. While it can be used for hosting websites, it's not typically the primary choice for simple website hosting scenarios."
+        }
+    },
+    'true/false': {
+        'question': "Microsoft Planner can be used to provide customized appointments that customers can schedule on a website.",
+        'options': ["True", "False"],
+        'correct_answer': 2,
+        'explanations': {
+            '1': "This is incorrect. Microsoft Planner is a task management tool designed for team collaboration and project management. It does not have built-in functionality for customer appointment scheduling on websites.",
+            '2': "This is correct. Microsoft Planner is not designed for customer appointment scheduling. For this purpose, Microsoft offers a different tool called Microsoft Bookings, which is specifically designed to allow customers to schedule appointments through a web interface."
+        }
+    },
+    'multi-response': {
+        'question': "A company plans to migrate on-premises infrastructure to the cloud. What are three benefits of migrating to the cloud? Each correct answer presents a complete solution.",
+        'options': ["Reduce configuration requirements on desktop computers.", "Reduce on-site network latency.", "Automate data backup and disaster recovery.", "Scale and extend applications.", "Eliminate the cost of buying server hardware."],
+        'correct_answers': [3, 4, 5],
+        'explanations': {
+            '1': "This is incorrect. While cloud migration can simplify some aspects of IT management, it typically does not significantly reduce configuration requirements on desktop computers. Desktop management is often handled separately from cloud infrastructure.",
+            '2': "This is incorrect. Migrating to the cloud does not inherently reduce on-site network latency. In fact, it may introduce additional latency for accessing cloud-based resources, depending on the network configuration and distance to the cloud data centers.",
+            '3': "This is correct. Cloud services often provide built-in tools and features for automating data backup and disaster recovery processes, improving data protection and business continuity.",
+            '4': "This is correct. Cloud platforms offer scalability, allowing businesses to easily scale up or down their resources based on demand. They also provide services and tools that enable the extension of applications with new features and capabilities.",
+            '5': "This is correct. By migrating to the cloud, companies can reduce or eliminate the need to purchase and maintain physical server hardware, as the cloud provider manages the underlying infrastructure."
+        }
+    },
+}
+
+BATCH_EXAMPLE = [{
+    'slot': 1,
+    'question': "Microsoft Planner can be used to provide customized appointments that customers can schedule on a website.",
+    'options': ["True", "False"],
+    'correct_answer': 2,
+    'explanations': {
+        '1': "This is incorrect. Planner is a task management tool; customer appointment scheduling is provided by Microsoft Bookings.",
+        '2': "This is correct. Microsoft Bookings, not Planner, lets customers schedule appointments through a web interface."
+    }
+}]
+
+def selection_text(selection):
+    topic, objective, sub_objective = selection
+    text = f"focusing on '{topic}', covering the objective '{objective}'"
+    if sub_objective:
+        text += f" and the subtopic '{sub_objective}'"
+    return text
+
+
+class PromptTemplate:
+    """
+    The prompt for one (exam, question type), built once. Everything that never changes (system prompt,
+    answer format, example) comes first and is byte-identical across calls, so providers that cache
+    prompt prefixes can reuse it; the difficulty and syllabus slot are appended last.
+    """
+
+    def __init__(self, exam_code, question_type):
+        self.exam_code = exam_code
+        self.question_type = question_type
+        self.system = system_prompt(exam_code)
+        self.prefix = (
+            f"{SINGLE_FORMATS[question_type]}\n"
+            f"Example:\n{json.dumps(SINGLE_EXAMPLES[question_type], ensure_ascii=False)}\n\n"
+        )
+
+    def user_prompt(self, difficulty, selection):
+        return f"{self.prefix}Generate a {difficulty} {self.question_type} question for the {self.exam_code} exam {selection_text(selection)}."
+
+    def messages(self, difficulty, selection):
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user_prompt(difficulty, selection)}
+        ]
+
+
+class BatchPromptTemplate:
+    """
+    PromptTemplate for batched generation. The formats of all question types are always listed so the
+    prefix stays the same whichever types a batch mixes; the numbered slots come last.
+    """
+
+    def __init__(self, exam_code):
+        self.exam_code = exam_code
+        self.system = system_prompt(exam_code)
+        formats = "\n".join(f"- {question_type}: {BATCH_FORMATS[question_type]}" for question_type in BATCH_FORMATS)
+        self.prefix = (
+            "Return only a JSON array with one question for each numbered slot listed at the end of this message. "
+            "Each element is a JSON object with the fields "
+            "'slot' (the slot number), 'question', 'options' (list of options), the answer field for its type, "
+            "and 'explanations' (a dict mapping every option number to an explanation).\n"
+            f"\nAnswer format per question type:\n{formats}\n"
+            f"\nExample of the expected format:\n{json.dumps(BATCH_EXAMPLE, ensure_ascii=False)}\n\n"
+        )
+
+    def user_prompt(self, difficulty, slots):
+        lines = [f"{self.prefix}Generate {len(slots)} {difficulty} questions for the {self.exam_code} exam, one for each slot:"]
+        for number, (question_type, selection) in enumerate(slots, 1):
+            lines.append(f"{number}. {question_type} question {selection_text(selection)}")
+        return "\n".join(lines)
+
+    def messages(self, difficulty, slots):
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user_prompt(difficulty, slots)}
+        ]
+
+
+_system_prompts = {}
+_templates = {}
+
+def system_prompt(exam_code="MS-900"):
+    """
+    The system prompt shared by single and batched question generation, built once per exam.
+    """
+    prompt = _system_prompts.get(exam_code)
+    if prompt is None:
+        prompt = _system_prompts.setdefault(exam_code, (
+            f"You are a knowledgeable assistant that understands the {exam_code} exam topics and structure. "
+            f"You will act as a quiz generator for the {exam_code} exam, and your questions should closely follow the format and content of the actual exam. "
+            "Ensure that the questions are varied, non-repetitive, and cover a wide range of topics within the exam scope. "
+            "Pay attention to the following guidelines:\n"
+            "1. Questions should be clear, concise, and unambiguous.\n"
+            "2. Use appropriate terminology and concepts relevant to the exam.\n"
+            "3. Ensure that incorrect options (distractors) are plausible but clearly incorrect.\n"
+            "4. Provide detailed explanations for both correct and incorrect answers.\n"
+            "5. Align the difficulty level with the specified requirement (easy, medium, hard).\n"
+            "6. For multi-response questions, clearly indicate that multiple options may be correct.\n"
+            "7. Avoid using absolute terms like 'always' or 'never' unless specifically pointing to a correct or incorrect answer.\n"
+            "8. Ensure that the correct answer(s) fully address the question asked.\n"
+            "9. Use real-world scenarios when appropriate to test practical understanding.\n"
+            "10. Adhere strictly to the JSON format specified in the prompt."
+        ))
+    return prompt
+
+def get_template(exam_code, question_type):
+    """
+    The PromptTemplate for (exam_code, question_type), or None for an unknown question type.
+    """
+    if question_type not in SINGLE_FORMATS:
+        return None
+    key = (exam_code, question_type)
+    template = _templates.get(key)
+    if template is None:
+        # Templates are immutable, so a race only builds one twice
+        template = _templates.setdefault(key, PromptTemplate(exam_code, question_type))
+    return template
+
+def get_batch_template(exam_code):
+    key = (exam_code, 'batch')
+    template = _templates.get(key)
+    if template is None:
+        template = _templates.setdefault(key, BatchPromptTemplate(exam_code))
+    return template
@@ -0,0 +1,76 @@
+# providers.py
+import os
+import threading
+
+# Environment variable that names the backend for each kind of provider, and the backend used when it is unset
+BACKEND_SETTINGS = {
+    'llm': ('LLM_BACKEND', 'openai'),
+    'docs_search': ('DOCS_BACKEND', 'bing'),
+}
+
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+_factories = {}
+_env_loaded = False
+_env_lock = threading.Lock()
+
+def register(kind, name):
+    """
+    Decorator registering factory() as the `name` backend for `kind`. Factories import their
+    dependencies themselves, so nothing heavy is loaded until a backend is actually built.
+    """
+    def decorator(factory):
+        _factories[(kind, name)] = factory
+        return factory
+    return decorator
+
+def backend_name(kind):
+    variable, default = BACKEND_SETTINGS[kind]
+    return os.environ.get(variable, default)
+
+def create(kind, name=None):
+    """
+    Build the configured (or named) backend for kind.
+    """
+    name = name or backend_name(kind)
+    factory = _factories.get((kind, name))
+    if factory is None:
+        available = sorted(backend for registered, backend in _factories if registered == kind)
+        raise ValueError(f"Unknown {kind} backend '{name}'; expected one of {available}")
+    return factory()
+
+def load_env(path=ENV_FILE):
+    """
+    Apply the .env file next to the app once. python-dotenv is only imported when there is a file to read.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            if os.path.exists(path):
+                from dotenv import load_dotenv
+                load_dotenv(path)
+            _env_loaded = True
+
+
+@register('llm', 'openai')
+def openai_client():
+    load_env()
+    from openai import OpenAI
+    return OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), timeout=float(os.environ.get("LLM_TIMEOUT", 60)))
+
+@register('llm', 'fake')
+def fake_client():
+    from llm_cache import FakeChatClient
+    return FakeChatClient()
+
+@register('docs_search', 'bing')
+def bing_search():
+    from bing_search import search_bing
+    return search_bing
+
+@register('docs_search', 'local')
+def local_search():
+    from local_docs import search_local_docs
+    return search_local_docs
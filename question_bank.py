@@ -0,0 +1,132 @@
+# question_bank.py
+import os
+import json
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from dedup import NearDuplicateIndex, question_text
+
+DEFAULT_BANK_PATH = os.environ.get("QUIZZR_QUESTION_BANK", "question_bank.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exam_code TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    objective TEXT NOT NULL,
+    sub_objective TEXT,
+    difficulty TEXT NOT NULL,
+    question_type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_questions_slot
+    ON questions (exam_code, topic, objective, sub_objective, difficulty, question_type);
+"""
+
+
+class QuestionBank:
+    """
+    Persistent store of generated questions, indexed by syllabus slot, difficulty and question type.
+    """
+
+    def __init__(self, path=DEFAULT_BANK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._duplicates = NearDuplicateIndex()
+        self._indexed_keys = set()
+
+    def _duplicate_key(self, exam_code, objective, sub_objective):
+        """
+        Near-duplicates are tracked per sub-objective. The index for a sub-objective is loaded from the
+        stored questions the first time it is needed.
+        """
+        key = (exam_code, objective, sub_objective)
+        if key not in self._indexed_keys:
+            rows = self._conn.execute(
+                "SELECT id, data FROM questions WHERE exam_code = ? AND objective = ? AND sub_objective IS ?", key
+            ).fetchall()
+            for bank_id, data in rows:
+                self._duplicates.add(key, question_text(json.loads(data)), bank_id)
+            self._indexed_keys.add(key)
+        return key
+
+    def add(self, question_data, difficulty, question_type, exam_code="MS-900"):
+        """
+        Store a parsed question and return its bank id, or None if it nearly duplicates a stored question.
+        """
+        payload = {k: v for k, v in question_data.items() if k != 'bank_id'}
+        text = question_text(question_data)
+        with self._lock:
+            key = self._duplicate_key(exam_code, question_data['objective'], question_data.get('sub_objective'))
+            if self._duplicates.find_duplicate(key, text) is not None:
+                logging.info(f"Not storing near-duplicate question for '{question_data.get('sub_objective')}'")
+                return None
+            cursor = self._conn.execute(
+                "INSERT INTO questions (exam_code, topic, objective, sub_objective, difficulty, question_type, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (exam_code, question_data['topic'], question_data['objective'], question_data.get('sub_objective'),
+                 difficulty, question_type, json.dumps(payload), time.time())
+            )
+            self._conn.commit()
+            self._duplicates.add(key, text, cursor.lastrowid)
+        return cursor.lastrowid
+
+    def draw(self, topic, objective, sub_objective, difficulty, question_type, exam_code="MS-900", exclude_ids=()):
+        """
+        Return a random question for the given slot that is not in exclude_ids, or None if the slot has run out.
+        """
+        query = (
+            "SELECT id, data FROM questions WHERE exam_code = ? AND topic = ? AND objective = ? "
+            "AND sub_objective IS ? AND difficulty = ? AND question_type = ?"
+        )
+        params = [exam_code, topic, objective, sub_objective, difficulty, question_type]
+        exclude_ids = list(exclude_ids)
+        if exclude_ids:
+            query += f" AND id NOT IN ({','.join('?' * len(exclude_ids))})"
+            params.extend(exclude_ids)
+        query += " ORDER BY RANDOM() LIMIT 1"
+
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        if row is None:
+            return None
+
+        question_data = json.loads(row[1])
+        question_data['bank_id'] = row[0]
+        return question_data
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+def get_bank():
+    """
+    Return the process-wide question bank, opening it on first use. It is closed at exit.
+    """
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = QuestionBank()
+                atexit.register(_bank.close)
+    return _bank
+
+def store_question(question_data, difficulty, question_type, exam_code="MS-900"):
+    """
+    Write a generated question back to the bank. Failures are logged, never raised.
+    """
+    try:
+        return get_bank().add(question_data, difficulty, question_type, exam_code)
+    except sqlite3.Error as e:
+        logging.error(f"Error storing question in bank: {e}")
+        return None
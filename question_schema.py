@@ -0,0 +1,195 @@
+# question_schema.py
+import re
+import json
+import ast
+import logging
+from metrics import REGISTRY
+
+OPTION_COUNTS = {
+    'multiple-choice': (4, 4),
+    'true/false': (2, 2),
+    'multi-response': (4, 6),
+}
+
+VALIDATION_RESULTS = REGISTRY.counter(
+    'quizzr_question_validation_total',
+    "Generated questions by how they were accepted: valid, lenient, repaired or failed.",
+    ['call', 'result']
+)
+
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+def validate_question(question_data, question_type):
+    """
+    Return a list of problems with a parsed question; an empty list means it is valid.
+    """
+    if not isinstance(question_data, dict):
+        return ["the question must be a JSON object"]
+    errors = []
+
+    if not isinstance(question_data.get('question'), str) or not question_data['question'].strip():
+        errors.append("'question' must be a non-empty string")
+
+    options = question_data.get('options')
+    if not isinstance(options, list) or not all(isinstance(option, str) and option.strip() for option in options):
+        errors.append("'options' must be a list of non-empty strings")
+        options = []
+    else:
+        low, high = OPTION_COUNTS[question_type]
+        if not low <= len(options) <= high:
+            expected = str(low) if low == high else f"{low}-{high}"
+            errors.append(f"a {question_type} question needs {expected} options, not {len(options)}")
+
+    if question_type == 'multi-response':
+        answers = question_data.get('correct_answers')
+        if not isinstance(answers, list) or not answers or not all(isinstance(answer, int) for answer in answers):
+            errors.append("'correct_answers' must be a non-empty list of integer option numbers")
+        elif len(set(answers)) != len(answers) or not all(1 <= answer <= len(options) for answer in answers):
+            errors.append(f"'correct_answers' must be distinct option numbers between 1 and {len(options)}")
+    else:
+        answer = question_data.get('correct_answer')
+        if not isinstance(answer, int) or isinstance(answer, bool):
+            errors.append("'correct_answer' must be an integer option number")
+        elif not 1 <= answer <= len(options):
+            errors.append(f"'correct_answer' must be between 1 and {len(options)}")
+
+    explanations = question_data.get('explanations')
+    if not isinstance(explanations, dict):
+        errors.append("'explanations' must map every option number to an explanation")
+    else:
+        missing = [str(i) for i in range(1, len(options) + 1) if not str(explanations.get(str(i), '')).strip()]
+        if missing:
+            errors.append(f"'explanations' is missing options {', '.join(missing)}")
+    return errors
+
+def normalize_question(question_data, question_type):
+    """
+    Coerce harmless variations (numeric strings, integer explanation keys, a one-item answer list)
+    into the canonical shape before validation.
+    """
+    if not isinstance(question_data, dict):
+        return question_data
+
+    def as_int(value):
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value.strip())
+        return value
+
+    if question_type == 'multi-response':
+        answers = question_data.get('correct_answers')
+        if isinstance(answers, list):
+            question_data['correct_answers'] = [as_int(answer) for answer in answers]
+    else:
+        answer = question_data.get('correct_answer')
+        if isinstance(answer, list) and len(answer) == 1:
+            answer = answer[0]
+        question_data['correct_answer'] = as_int(answer)
+
+    explanations = question_data.get('explanations')
+    if isinstance(explanations, dict):
+        question_data['explanations'] = {str(key): value for key, value in explanations.items()}
+    elif isinstance(explanations, list):
+        question_data['explanations'] = {str(i): value for i, value in enumerate(explanations, 1)}
+    return question_data
+
+def _python_literals(text):
+    """
+    Rewrite bare JSON true/false/null outside string literals so ast.literal_eval accepts the text.
+    """
+    result = []
+    quote = None
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if quote:
+            result.append(char)
+            if char == '\\' and index + 1 < len(text):
+                result.append(text[index + 1])
+                index += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+            result.append(char)
+        else:
+            match = re.match(r"(true|false|null)\b", text[index:])
+            if match and not (result and (result[-1].isalnum() or result[-1] == '_')):
+                result.append({'true': 'True', 'false': 'False', 'null': 'None'}[match.group(1)])
+                index += len(match.group(1))
+                continue
+            result.append(char)
+        index += 1
+    return ''.join(result)
+
+def lenient_loads(text):
+    """
+    Parse JSON that may use single quotes or trailing commas.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    without_commas = TRAILING_COMMA.sub(r"\1", text)
+    try:
+        return json.loads(without_commas)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return ast.literal_eval(_python_literals(without_commas))
+    except (ValueError, SyntaxError, MemoryError, RecursionError) as e:
+        raise ValueError(f"Could not parse question JSON: {e}") from e
+
+def extract_object(content):
+    start = content.find('{')
+    end = content.rfind('}') + 1
+    return content[start:end].strip() if start != -1 and end > start else content.strip()
+
+def parse_question(content, question_type, repair=None, call='single'):
+    """
+    Parse and validate one question from model output.
+
+    Strict JSON is tried first, then the lenient parser, then - if given - repair(text, errors),
+    a short follow-up request that returns corrected text. Returns the question dict or None, and
+    counts which stage accepted it.
+    """
+    text = extract_object(content)
+    result = 'valid'
+    try:
+        question_data = json.loads(text)
+    except json.JSONDecodeError:
+        result = 'lenient'
+        try:
+            question_data = lenient_loads(text)
+        except ValueError as e:
+            question_data, errors = None, [str(e)]
+    if question_data is not None:
+        question_data = normalize_question(question_data, question_type)
+        errors = validate_question(question_data, question_type)
+
+    if errors and repair is not None:
+        result = 'repaired'
+        try:
+            repaired = repair(text, errors)
+            question_data = normalize_question(lenient_loads(extract_object(repaired)), question_type)
+            errors = validate_question(question_data, question_type)
+        except Exception as e:
+            errors = [f"repair failed: {e}"]
+
+    if errors:
+        VALIDATION_RESULTS.inc(call=call, result='failed')
+        logging.error(f"Discarding invalid {question_type} question: {'; '.join(errors)}")
+        return None
+    VALIDATION_RESULTS.inc(call=call, result=result)
+    return question_data
+
+def validation_report():
+    """
+    Counts and rates of valid, lenient, repaired and failed questions per call type.
+    """
+    report = {}
+    for call in ('single', 'batch', 'stream'):
+        counts = {result: VALIDATION_RESULTS.value(call=call, result=result) for result in ('valid', 'lenient', 'repaired', 'failed')}
+        total = sum(counts.values())
+        if total:
+            report[call] = {**counts, 'total': total, **{f"{result}_rate": counts[result] / total for result in counts}}
+    return report
@@ -1,25 +1,210 @@
 # quiz.py
-from quiz_generator import generate_question
+import time
+import random
+import logging
+import sqlite3
+from quiz_generator import generate_question, generate_questions, select_objective, QUESTION_TYPES
+from question_bank import get_bank
+from bank_export import draw_exported
+from dedup import NearDuplicateIndex, fingerprint_text
+from scheduler import CoverageScheduler, LeitnerScheduler
+from records import Question, Attempt, answer_mask
+from resilience import get_guard
+
+# How many times a slot is redrawn or regenerated when the result repeats an earlier question
+DUPLICATE_RETRIES = 2
+
+# Syllabus levels tracked by the running performance aggregates
+PERFORMANCE_LEVELS = ('topic', 'objective', 'sub_objective')
+
+# Share of credit below which an area is reported as weak
+WEAK_AREA_THRESHOLD = 0.7
 
 class Quiz:
-    def __init__(self, num_questions, difficulty, topic):
+    def __init__(self, num_questions, difficulty, topic, weight_weak_areas=False, adaptive=False):
         self.num_questions = num_questions
         self.difficulty = difficulty
         self.topic = topic
+        # Adaptive quizzes pick each slot from Leitner boxes that favour the user's weak sub-objectives
+        self.scheduler = LeitnerScheduler(topic) if adaptive else CoverageScheduler(topic, weight_weak_areas)
         self.score = 0
         self.current_question = 0
         self.user_performance = []
+        # Running [credit, attempts] per topic, objective and sub-objective; partial answers earn half credit
+        self.performance = {level: {} for level in PERFORMANCE_LEVELS}
         self.questions = []
+        self._duplicates = None
+        self._indexed_keys = set()
+        self._indexed_questions = 0
 
     def generate_questions(self):
         if not self.questions:
-            self.questions = [generate_question(self.difficulty, self.topic) for _ in range(self.num_questions)]
+            self.questions = self.generate_next_questions(self.num_questions)
     
     def generate_next_question(self):
-        if len(self.questions) < self.num_questions:
-            question = generate_question(self.difficulty, self.topic)
+        questions = self.generate_next_questions(1)
+        return questions[0] if questions else None
+
+    def generate_next_questions(self, count, slots=None):
+        """
+        Return up to count new questions, drawn from the bank where possible.
+        Slots the bank cannot serve are generated together in a single batched LLM call.
+        Given (question_type, selection) slots are used instead of drawing count from the scheduler.
+        """
+        questions, misses = self.draw_slots(count, slots)
+        guard = get_guard()
+
+        # The bank has run out for these slots, so fall back to the LLM
+        if len(misses) == 1:
+            # A single miss is on the request path, so it runs under the deadline with a bank fallback
+            question_type, selection = misses[0]
+            expires = time.monotonic() + guard.deadline
+            for attempt in range(DUPLICATE_RETRIES + 1):
+                remaining = expires - time.monotonic()
+                if attempt and remaining <= 0:
+                    # A duplicate used up the deadline, so a retry would be a paid call nobody waits for
+                    generated, path = self.fallback_question(selection, question_type, questions), 'fallback'
+                else:
+                    generated, path = guard.run(
+                        lambda: generate_question(self.difficulty, self.topic, question_type=question_type, selection=selection),
+                        lambda: self.fallback_question(selection, question_type, questions),
+                        deadline=remaining
+                    )
+                question = self.served_question(generated, path)
+                if path not in ('llm', 'llm_hedged'):
+                    # Fallbacks come from the bank already checked for duplicates; there is no time left to retry
+                    if question:
+                        questions.append(question)
+                    break
+                if question and self.accept_question(question):
+                    questions.append(question)
+                    break
+        elif misses and guard.breaker.allow():
+            generated = guard.observe(lambda: generate_questions(self.difficulty, self.topic, len(misses), slots=misses) or None)
+            generated = (self.served_question(question, 'llm') for question in generated or [])
+            questions.extend(question for question in generated if self.accept_question(question))
+        return questions
+
+    def served_question(self, question, path):
+        """
+        Wrap a generated question dict (fallbacks are already Questions) and note how it was served.
+        """
+        if question is None:
+            return None
+        if isinstance(question, dict):
+            question = Question.from_dict(question)
+        if path in ('fallback', 'breaker_open'):
+            question.source = f"bank_{path}"
+        else:
+            question.source = path
+        return question
+
+    def fallback_question(self, selection, question_type, pending=()):
+        """
+        A stored question for the same sub-objective in any question type, served when generation is
+        too slow or the upstream is failing.
+        """
+        question = self.draw_from_bank(selection, question_type, pending)
+        if question is None:
+            question, _ = self.draw_any_type(selection, question_type, pending)
+        return question
+
+    def draw_slots(self, count, slots=None):
+        """
+        Pick the next count slots, unless slots are given, and draw each from the bank. Returns the drawn
+        questions and the (question_type, selection) slots the bank could not serve.
+        """
+        if slots is None:
+            count = min(count, self.num_questions - len(self.questions))
+            slots = [self.next_slot() for _ in range(max(count, 0))]
+        questions = []
+        misses = []
+        for question_type, selection in slots:
+            question = self.draw_from_bank(selection, question_type, questions)
+            if question is None and self.adaptive:
+                # Targeting the slot matters more than the question type, so try the bank's other types first
+                question, question_type = self.draw_any_type(selection, question_type, questions)
             if question:
+                questions.append(question)
+            else:
+                misses.append((question_type, selection))
+        return questions, misses
+
+    def accept_question(self, question):
+        """
+        Record a question in the quiz's near-duplicate index. Returns False if it nearly repeats
+        a question already in, or already accepted for, this quiz.
+        """
+        if not question:
+            return False
+        if self._duplicates is None:
+            self._duplicates = NearDuplicateIndex()
+        # Only questions of the same sub-objective can clash, so earlier questions are MinHashed per
+        # sub-objective on first use; a quiz reloaded from the session store does not redo them all
+        for earlier in self.questions[self._indexed_questions:]:
+            if earlier and earlier.sub_objective in self._indexed_keys:
+                self._duplicates.add(earlier.sub_objective, fingerprint_text(earlier.question, earlier.options))
+        self._indexed_questions = len(self.questions)
+        key = question.sub_objective
+        if key not in self._indexed_keys:
+            for earlier in self.questions:
+                if earlier and earlier.sub_objective == key:
+                    self._duplicates.add(key, fingerprint_text(earlier.question, earlier.options))
+            self._indexed_keys.add(key)
+        return self._duplicates.add(key, fingerprint_text(question.question, question.options))
+
+    @property
+    def adaptive(self):
+        return getattr(self.scheduler, 'adaptive', False)
+
+    def draw_any_type(self, selection, question_type, pending=()):
+        """
+        Draw a question for the slot in any other question type. Returns (question, question_type).
+        """
+        for other_type in QUESTION_TYPES:
+            if other_type != question_type:
+                question = self.draw_from_bank(selection, other_type, pending)
+                if question:
+                    return question, other_type
+        return None, question_type
+
+    def next_slot(self):
+        return random.choice(QUESTION_TYPES), select_objective(self.topic, self.scheduler)
+
+    def draw_next_question(self):
+        """
+        Return a new question from the bank without calling the LLM, or None on a miss.
+        """
+        if len(self.questions) >= self.num_questions:
+            return None
+        question_type, selection = self.next_slot()
+        question = self.draw_from_bank(selection, question_type)
+        if question is None and self.adaptive:
+            question, _ = self.draw_any_type(selection, question_type)
+        return question
+
+    def draw_from_bank(self, selection, question_type, pending=()):
+        """
+        Draw an unused question for the slot, redrawing when it repeats one in this quiz. The memory-mapped
+        export is tried first; the SQLite bank serves slots it has run out of and questions stored since.
+        """
+        topic, objective, sub_objective = selection
+        used_ids = [q.bank_id for q in list(self.questions) + list(pending) if q and q.bank_id is not None]
+        for _ in range(DUPLICATE_RETRIES + 1):
+            question = draw_exported(selection, self.difficulty, question_type, used_ids)
+            if question is None:
+                try:
+                    question = get_bank().draw(topic, objective, sub_objective, self.difficulty, question_type, exclude_ids=used_ids)
+                except sqlite3.Error as e:
+                    logging.error(f"Error drawing question from bank: {e}")
+                    return None
+                if question is None:
+                    return None
+                question = Question.from_dict(question)
+            question.source = 'bank'
+            if self.accept_question(question):
                 return question
+            used_ids.append(question.bank_id)
         return None
 
     def get_current_question(self):
@@ -31,31 +216,17 @@ class Quiz:
         if self.current_question >= len(self.questions):
             return False, False
 
-        question_data = self.questions[self.current_question]
-        is_correct = False
-        partially_correct = False
-
-        if 'correct_answers' in question_data:  # Multi-response question
-            correct_answers = set(question_data['correct_answers'])
-            user_answers = set(user_answer)
-            is_correct = user_answers == correct_answers
-            partially_correct = bool(user_answers & correct_answers) and not is_correct
-        else:  # Single-response question
-            correct_answer = question_data['correct_answer']
-            is_correct = user_answer[0] == correct_answer
-
-        if is_correct:
-            self.score += 1
-        elif partially_correct:
-            self.score += 0.5
-
-        self.user_performance.append({
-            'question': question_data['question'],
-            'user_answer': user_answer,
-            'correct_answer': question_data.get('correct_answer') or question_data.get('correct_answers'),
-            'is_correct': is_correct,
-            'partially_correct': partially_correct
-        })
+        question = self.questions[self.current_question]
+        mask = answer_mask(user_answer)
+        is_correct, partially_correct = question.grade(mask)
+
+        self.scheduler.record_result(question.topic, question.objective, question.sub_objective, is_correct, partially_correct)
+
+        credit = 1 if is_correct else 0.5 if partially_correct else 0
+        self.score += credit
+        self.record_performance(question, credit)
+
+        self.user_performance.append(Attempt(self.current_question, question.slot, mask, is_correct, partially_correct))
 
         return is_correct, partially_correct
 
@@ -63,48 +234,36 @@ class Quiz:
         if self.current_question >= len(self.questions):
             return None
 
-        question_data = self.questions[self.current_question]
-        if 'correct_answers' in question_data:
-            correct_answer = question_data['correct_answers']
-            explanation = [question_data['explanations'].get(str(ans)) for ans in correct_answer]
+        question = self.questions[self.current_question]
+        if question.multi_response:
+            correct_answer = question.correct_answers
+            explanation = [question.explanation(ans) for ans in correct_answer]
         else:
-            correct_answer = question_data['correct_answer']
-            explanation = question_data['explanations'].get(str(correct_answer))
+            correct_answer = question.correct_answer
+            explanation = question.explanation(correct_answer) if correct_answer else None
 
         return {
             'correct_answer': correct_answer,
             'explanation': explanation,
-            'topic': question_data.get('topic', "Unknown"),
-            'objective': question_data.get('objective', "Unknown"),
-            'sub_objective': question_data.get('sub_objective', "Unknown")
+            'topic': question.topic or "Unknown",
+            'objective': question.objective or "Unknown",
+            'sub_objective': question.sub_objective or "Unknown"
     }
 
-    def show_performance_summary(self):
-        topic_performance = {}
-        for question in self.user_performance:
-            topic = question['question'].split(':')[0]  # Assuming topics are prefixed in questions
-            if topic not in topic_performance:
-                topic_performance[topic] = {'correct': 0, 'total': 0}
-            topic_performance[topic]['total'] += 1
-            if question['is_correct']:
-                topic_performance[topic]['correct'] += 1
+    def record_performance(self, question, credit):
+        for level, key in zip(PERFORMANCE_LEVELS, (question.topic, question.objective, question.sub_objective)):
+            if key is None:
+                continue
+            totals = self.performance[level].setdefault(key, [0, 0])
+            totals[0] += credit
+            totals[1] += 1
 
+    def show_performance_summary(self, level='topic'):
         summary = []
-        for topic, performance in topic_performance.items():
-            percentage = (performance['correct'] / performance['total']) * 100
-            summary.append(f"{topic}: {percentage:.2f}% correct ({performance['correct']}/{performance['total']})")
-
+        for area, (credit, total) in self.performance[level].items():
+            percentage = (credit / total) * 100
+            summary.append(f"{area}: {percentage:.2f}% correct ({credit:g}/{total})")
         return summary
 
-    def get_weak_areas(self):
-        topic_performance = {}
-        for question in self.user_performance:
-            topic = question['question'].split(':')[0]  # Assuming topics are prefixed in questions
-            if topic not in topic_performance:
-                topic_performance[topic] = {'correct': 0, 'total': 0}
-            topic_performance[topic]['total'] += 1
-            if question['is_correct']:
-                topic_performance[topic]['correct'] += 1
-
-        weak_areas = [topic for topic, perf in topic_performance.items() if (perf['correct'] / perf['total']) < 0.7]
-        return weak_areas
\ No newline at end of file
+    def get_weak_areas(self, level='topic', threshold=WEAK_AREA_THRESHOLD):
+        return [area for area, (credit, total) in self.performance[level].items() if credit / total < threshold]
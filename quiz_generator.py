@@ -1,16 +1,106 @@
 # quiz_generator.py
 import os
+import re
 import json
+import time
+import threading
 import random
 import logging
-from openai import OpenAI
-from dotenv import load_dotenv
+import providers
+from question_bank import store_question
+from llm_cache import CachingChatClient, ResponseStore
+from metrics import REGISTRY, timed
+from question_schema import parse_question
+from prompts import system_prompt, get_template, get_batch_template, BATCH_FORMATS
 
-# Load environment variables
-load_dotenv()
+def create_client():
+    """
+    Build the chat client from the provider registry. LLM_BACKEND picks the backend (openai by default,
+    fake for the offline stand-in), and OPENAI_BASE_URL can point the OpenAI client at a local compatible
+    server. LLM_TIMEOUT bounds each HTTP request. LLM_CACHE_MODE (cache, record or replay) wraps
+    the client with the response store at LLM_CACHE_PATH.
+    """
+    llm_client = providers.create('llm')
+    cache_mode = os.environ.get("LLM_CACHE_MODE", "off")
+    if cache_mode != "off":
+        store = ResponseStore(os.environ.get("LLM_CACHE_PATH", "llm_cache.db"))
+        llm_client = CachingChatClient(llm_client, store, cache_mode)
+    return llm_client
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Return the chat client, creating it on first use so importing this module stays cheap.
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = create_client()
+    return client
+
+def set_client(new_client):
+    """
+    Swap the chat client used for generation, e.g. for a fake or a caching wrapper.
+    """
+    global client
+    client = new_client
+
+LLM_SECONDS = REGISTRY.histogram('quizzr_llm_request_seconds', "Chat completion latency.", ['call'])
+LLM_TOKENS = REGISTRY.counter('quizzr_llm_tokens_total', "Tokens reported in response.usage.", ['call', 'kind', 'question_type'])
+GENERATE_RESULTS = REGISTRY.counter('quizzr_generate_question_total', "generate_question outcomes.", ['result'])
+QUESTIONS_GENERATED = REGISTRY.counter('quizzr_llm_questions_total', "Generated questions stored, by question type.", ['question_type'])
+
+TOKEN_KINDS = ('prompt', 'cached_prompt', 'completion')
+
+def record_usage(response, call, totals=None, question_types=()):
+    """
+    Count the response's tokens, split evenly over the question types the call asked for, and add them
+    to the totals dict when the caller keeps its own tally. Prompt tokens the provider served from its
+    prefix cache are also counted as 'cached_prompt'.
+    """
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    details = getattr(usage, 'prompt_tokens_details', None)
+    counts = {
+        'prompt': getattr(usage, 'prompt_tokens', 0) or 0,
+        'cached_prompt': getattr(details, 'cached_tokens', 0) or 0,
+        'completion': getattr(usage, 'completion_tokens', 0) or 0
+    }
+    shares = {}
+    for question_type in question_types or ('',):
+        shares[question_type] = shares.get(question_type, 0) + 1
+    requested = sum(shares.values())
+    for kind, tokens in counts.items():
+        for question_type, count in shares.items():
+            LLM_TOKENS.inc(tokens * count / requested, call=call, kind=kind, question_type=question_type)
+        if totals is not None:
+            totals[f'{kind}_tokens'] = totals.get(f'{kind}_tokens', 0) + tokens
+
+def token_report():
+    """
+    Tokens spent per question type (generation and repair calls) and per generated question.
+    """
+    report = {}
+    for question_type in QUESTION_TYPES:
+        tokens = {
+            kind: sum(LLM_TOKENS.value(call=call, kind=kind, question_type=question_type) for call in ('single', 'batch', 'stream', 'repair'))
+            for kind in TOKEN_KINDS
+        }
+        questions = QUESTIONS_GENERATED.value(question_type=question_type)
+        if not questions and not any(tokens.values()):
+            continue
+        report[question_type] = {
+            **{f'{kind}_tokens': round(tokens[kind]) for kind in TOKEN_KINDS},
+            'questions': questions,
+            'prompt_tokens_per_question': round(tokens['prompt'] / questions, 1) if questions else None,
+            'completion_tokens_per_question': round(tokens['completion'] / questions, 1) if questions else None,
+            'cached_prompt_share': round(tokens['cached_prompt'] / tokens['prompt'], 3) if tokens['prompt'] else 0
+        }
+    return report
 
 # Define objectives for each topic
 objectives = {
@@ -122,187 +212,317 @@ objectives = {
     ],
 }
 
-# Initialize tracking dictionaries
-used_objectives = {topic: set() for topic in objectives.keys()}
-used_sub_objectives = {}
+QUESTION_TYPES = ['multiple-choice', 'true/false', 'multi-response']
+
+def select_objective(topic, scheduler=None):
+    """
+    Pick a (topic, objective, sub_objective) selection. Quizzes pass their own scheduler so
+    coverage rotates (or adapts) per quiz; without one the pick is uniformly random and keeps no shared state.
+    """
+    if scheduler is not None:
+        return scheduler.select()
 
-def select_objective(topic):
     if topic == 'All Topics':
         topic = random.choice(list(objectives.keys()))
     
-    topic_objectives = objectives[topic]
-    unused_objectives = [obj for idx, obj in enumerate(topic_objectives) if idx not in used_objectives[topic]]
-
-    if not unused_objectives:
-        used_objectives[topic] = set()
-        unused_objectives = topic_objectives
-
-    selected_objective = random.choice(unused_objectives)
-    objective_index = topic_objectives.index(selected_objective)
-    used_objectives[topic].add(objective_index)
-    objective_text = selected_objective['objective']
+    selected_objective = random.choice(objectives[topic])
+    sub_objectives = selected_objective.get('sub_objectives', [])
+    selected_sub_objective = random.choice(sub_objectives) if sub_objectives else None
+    return topic, selected_objective['objective'], selected_sub_objective
 
-    # Track sub-objectives
-    if objective_text not in used_sub_objectives:
-        used_sub_objectives[objective_text] = set()
+def generate_prompt(difficulty, question_type, topic, exam_code="MS-900", selection=None):
+    """
+    Build the user prompt for one question from the precompiled template for (exam_code, question_type).
+    If selection is given as a (topic, objective, sub_objective) tuple it is used instead of select_objective.
+    Returns the prompt ("" for an unknown question type) and the selected topic, objective and sub-objective.
+    """
+    selected_topic, objective_text, sub_objective = selection or select_objective(topic)
+    template = get_template(exam_code, question_type)
+    prompt = template.user_prompt(difficulty, (selected_topic, objective_text, sub_objective)) if template else ""
+    return prompt, selected_topic, objective_text, sub_objective
 
-    sub_objectives = selected_objective.get('sub_objectives', [])
-    unused_sub_objectives = [mo for idx, mo in enumerate(sub_objectives) if idx not in used_sub_objectives[objective_text]]
+def question_request(difficulty, topic, exam_code="MS-900", model="gpt-4o", temperature=0.7, question_type=None, selection=None):
+    """
+    Pick the question type and syllabus slot when they are not given and build the chat completion
+    arguments for one question. Returns (question_type, selection, arguments), or None for an unknown
+    question type.
+    """
+    # Randomly select a question type
+    if question_type is None:
+        question_type = random.choice(QUESTION_TYPES)
 
-    if not unused_sub_objectives:
-        used_sub_objectives[objective_text] = set()
-        unused_sub_objectives = sub_objectives
+    # Generate the prompt and get the selected topic, objective, and sub-objective
+    prompt, selected_topic, objective, sub_objective = generate_prompt(difficulty, question_type, topic, exam_code, selection)
 
-    selected_sub_objective = None
-    if unused_sub_objectives:
-        selected_sub_objective = random.choice(unused_sub_objectives)
-        sub_objective_index = sub_objectives.index(selected_sub_objective)
-        used_sub_objectives[objective_text].add(sub_objective_index)
+    if not prompt:
+        logging.error("Invalid question type selected.")
+        return None
 
-    return topic, objective_text, selected_sub_objective
+    return question_type, (selected_topic, objective, sub_objective), {
+        'model': model,
+        'messages': [
+            {"role": "system", "content": system_prompt(exam_code)},
+            {"role": "user", "content": prompt}
+        ],
+        'temperature': temperature,
+    }
 
-def generate_prompt(difficulty, question_type, topic, exam_code="MS-900"):
+def response_content(response, call, usage=None, question_types=()):
     """
-    Generate a prompt for the OpenAI API based on the difficulty, question type, and topic.
+    Count the response's tokens and return its text.
     """
-    # Base prompt
-    base_prompt = f"Generate a {difficulty} {question_type} question for the {exam_code} exam"
-    
-    # Add topic, objective, and sub-objective
-    selected_topic, objective_text, sub_objective = select_objective(topic)
-    base_prompt += f" focusing on '{selected_topic}'"
-    
-    if sub_objective:
-        base_prompt += f", specifically covering the objective '{objective_text}' and the subtopic '{sub_objective}'"
-    else:
-        base_prompt += f", specifically covering the objective '{objective_text}'"
-
-    # Continue building the prompt based on question type
-    if question_type == 'multiple-choice':
-        prompt = (
-            f"{base_prompt} with 4 options. Format the answer as a JSON object with these fields: "
-            "'question', 'options' (a list of options), "
-            "'correct_answer' (integer index starting from 1), "
-            "and 'explanations' (a dict mapping option numbers to explanations)."
-            "\nExample:"
-            "\n{"
-            "\n  'question': 'Your company is planning to migrate to Microsoft Azure and Microsoft 365. You are required to identify a cloud service that allows for website hosting. Which of the following is the model you should choose?',"
-            "\n  'options': ['Software as a Service (SaaS)', 'Platform as a Service (PaaS)', 'Infrastructure as a Service (IaaS)', 'Container as a Service (CaaS)'],"
-            "\n  'correct_answer': 2,"
-            "\n  'explanations': {"
-            "\n    '1': 'Software as a Service (SaaS) provides access to software applications over the internet, but does not typically offer direct website hosting capabilities. Examples include Microsoft 365 apps.',"
-            "\n    '2': 'Platform as a Service (PaaS) is the correct choice for website hosting. It provides a platform allowing customers to develop, run, and manage applications without the complexity of building and maintaining the infrastructure. Azure App Service is an example of PaaS that supports website hosting.',"
-            "\n    '3': 'Infrastructure as a Service (IaaS) provides virtualized computing resources over the internet. While it can be used for website hosting, it requires more management and configuration compared to PaaS, making it less suitable for this specific requirement.',"
-            "\n    '4': 'Container as a Service (CaaS) is a cloud service model that allows users to upload, organize, run, scale, and manage containers. While it can be used for hosting websites, it's not typically the primary choice for simple website hosting scenarios.'"
-            "\n  }"
-            "\n}"
-        )
-    elif question_type == 'true/false':
-        prompt = (
-            f"{base_prompt}. Format the answer as a JSON object with fields: "
-            "'question', 'options' (['True', 'False']), "
-            "'correct_answer' (1 for True, 2 for False), "
-            "and 'explanations' (dict mapping option numbers to explanations)."
-            "\nExample:"
-            "\n{"
-            "\n  'question': 'Microsoft Planner can be used to provide customized appointments that customers can schedule on a website.',"
-            "\n  'options': ['True', 'False'],"
-            "\n  'correct_answer': 2,"
-            "\n  'explanations': {"
-            "\n    '1': 'This is incorrect. Microsoft Planner is a task management tool designed for team collaboration and project management. It does not have built-in functionality for customer appointment scheduling on websites.',"
-            "\n    '2': 'This is correct. Microsoft Planner is not designed for customer appointment scheduling. For this purpose, Microsoft offers a different tool called Microsoft Bookings, which is specifically designed to allow customers to schedule appointments through a web interface.'"
-            "\n  }"
-            "\n}"
-        )
-    elif question_type == 'multi-response':
-        prompt = (
-            f"{base_prompt} with 4-6 options, where multiple options may be correct. Format the answer as a JSON object with fields: "
-            "'question', 'options' (list of options), "
-            "'correct_answers' (list of integer indices starting from 1), "
-            "and 'explanations' (dict mapping option numbers to explanations). "
-            "Be sure to specify that multiple options may be correct. In some cases you will specify the exact number of correct options in the question or requirements."
-            "\nExample:"
-            "\n{"
-            "\n  'question': 'A company plans to migrate on-premises infrastructure to the cloud. What are three benefits of migrating to the cloud? Each correct answer presents a complete solution.',"
-            "\n  'options': ['Reduce configuration requirements on desktop computers.', 'Reduce on-site network latency.', 'Automate data backup and disaster recovery.', 'Scale and extend applications.', 'Eliminate the cost of buying server hardware.'],"
-            "\n  'correct_answers': [3, 4, 5],"
-            "\n  'explanations': {"
-            "\n    '1': 'This is incorrect. While cloud migration can simplify some aspects of IT management, it typically does not significantly reduce configuration requirements on desktop computers. Desktop management is often handled separately from cloud infrastructure.',"
-            "\n    '2': 'This is incorrect. Migrating to the cloud does not inherently reduce on-site network latency. In fact, it may introduce additional latency for accessing cloud-based resources, depending on the network configuration and distance to the cloud data centers.',"
-            "\n    '3': 'This is correct. Cloud services often provide built-in tools and features for automating data backup and disaster recovery processes, improving data protection and business continuity.',"
-            "\n    '4': 'This is correct. Cloud platforms offer scalability, allowing businesses to easily scale up or down their resources based on demand. They also provide services and tools that enable the extension of applications with new features and capabilities.',"
-            "\n    '5': 'This is correct. By migrating to the cloud, companies can reduce or eliminate the need to purchase and maintain physical server hardware, as the cloud provider manages the underlying infrastructure.'"
-            "\n  }"
-            "\n}"
-        )
-    else:
-        prompt = ""
-    return prompt, selected_topic, objective_text, sub_objective
+    record_usage(response, call, usage, question_types)
+    return response.choices[0].message.content
 
-def generate_question(difficulty, topic, exam_code="MS-900", model = "gpt-4o", temperature=0.7):
+def generate_question(difficulty, topic, exam_code="MS-900", model = "gpt-4o", temperature=0.7, question_type=None, selection=None):
     """
     Generate a quiz question for the MS-900 exam based on the given difficulty.
+    Successfully parsed questions are written back to the question bank.
     """
-    
-    sys_prompt = (
-        f"You are a knowledgeable assistant that understands the {exam_code} exam topics and structure. "
-        f"You will act as a quiz generator for the {exam_code} exam, and your questions should closely follow the format and content of the actual exam. "
-        "Ensure that the questions are varied, non-repetitive, and cover a wide range of topics within the exam scope. "
-        "Pay attention to the following guidelines:\n"
-        "1. Questions should be clear, concise, and unambiguous.\n"
-        "2. Use appropriate terminology and concepts relevant to the exam.\n"
-        "3. Ensure that incorrect options (distractors) are plausible but clearly incorrect.\n"
-        "4. Provide detailed explanations for both correct and incorrect answers.\n"
-        "5. Align the difficulty level with the specified requirement (easy, medium, hard).\n"
-        "6. For multi-response questions, clearly indicate that multiple options may be correct.\n"
-        "7. Avoid using absolute terms like 'always' or 'never' unless specifically pointing to a correct or incorrect answer.\n"
-        "8. Ensure that the correct answer(s) fully address the question asked.\n"
-        "9. Use real-world scenarios when appropriate to test practical understanding.\n"
-        "10. Adhere strictly to the JSON format specified in the prompt."
+    request = question_request(difficulty, topic, exam_code, model, temperature, question_type, selection)
+    if request is None:
+        return None
+    question_type, selection, arguments = request
+
+    try:
+        with timed(LLM_SECONDS, span='llm', call='single'):
+            response = get_client().chat.completions.create(**arguments)
+        content = response_content(response, 'single', question_types=[question_type])
+    except Exception as e:
+        logging.error(f"Error fetching the question: {e}")
+        GENERATE_RESULTS.inc(result='none')
+        return None
+
+    question_data = parse_question(content, question_type, repairer(question_type, exam_code, model), call='single')
+    GENERATE_RESULTS.inc(result='ok' if question_data else 'none')
+    if question_data is None:
+        return None
+    return finalize_question(question_data, difficulty, question_type, selection, exam_code)
+
+def repair_request(text, errors, question_type, exam_code="MS-900", model="gpt-4o"):
+    """
+    Chat completion arguments asking the model to fix one invalid question.
+    """
+    prompt = (
+        f"The following {question_type} question for the {exam_code} exam is not valid JSON for our format. "
+        f"Problems: {'; '.join(errors)}.\n"
+        "Fix only these problems and keep the content unchanged. The object needs 'question', 'options', "
+        f"the answer field ({BATCH_FORMATS[question_type]}), and 'explanations' mapping every option number to an explanation. "
+        f"Return only the corrected JSON object.\n\n{text}"
     )
+    return {
+        'model': model,
+        'messages': [
+            {"role": "system", "content": "You repair malformed JSON. Reply with a single JSON object and nothing else."},
+            {"role": "user", "content": prompt}
+        ],
+        'temperature': 0,
+    }
+
+def repairer(question_type, exam_code="MS-900", model="gpt-4o", usage=None):
+    """
+    Return a repair(text, errors) callable that asks the model to fix one invalid question,
+    which is much cheaper than generating it again.
+    """
+    def repair(text, errors):
+        with timed(LLM_SECONDS, span='llm', call='repair'):
+            response = get_client().chat.completions.create(**repair_request(text, errors, question_type, exam_code, model))
+        return response_content(response, 'repair', usage, [question_type])
+    return repair
+
+def finalize_question(question_data, difficulty, question_type, selection, exam_code="MS-900"):
+    """
+    Attach syllabus metadata to a parsed question and write it back to the question bank.
+    """
+    # Add topic and objective information to the question data
+    question_data['topic'], question_data['objective'], question_data['sub_objective'] = selection
+    question_data['difficulty'] = difficulty
+    question_data['question_type'] = question_type
     
-    # Randomly select a question type
-    question_types = ['multiple-choice', 'true/false', 'multi-response']
-    question_type = random.choice(question_types)
-    
-    # Generate the prompt and get the selected topic, objective, and sub-objective
-    prompt, selected_topic, objective, sub_objective = generate_prompt(difficulty, question_type, topic, exam_code)
-    
-    if not prompt:
-        logging.error("Invalid question type selected.")
-        return None
+    QUESTIONS_GENERATED.inc(question_type=question_type)
+    bank_id = store_question(question_data, difficulty, question_type, exam_code)
+    if bank_id is not None:
+        question_data['bank_id'] = bank_id
     
+    return question_data
+
+def generate_batch_prompt(difficulty, slots, exam_code="MS-900"):
+    """
+    Build one prompt asking for a JSON array with a question for every (question_type, selection) slot.
+    """
+    return get_batch_template(exam_code).user_prompt(difficulty, slots)
+
+def iter_json_objects(content):
+    """
+    Yield the text of every top-level JSON object inside the first JSON array in content.
+    Objects are split by bracket matching so a malformed element does not affect its neighbours.
+    """
+    start = content.find('[')
+    if start == -1:
+        return
+    depth = 0
+    in_string = False
+    escaped = False
+    object_start = None
+    for index in range(start + 1, len(content)):
+        char = content[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            if depth == 0:
+                object_start = index
+            depth += 1
+        elif char == '}' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                yield content[object_start:index + 1]
+        elif char == ']' and depth == 0:
+            return
+
+def batch_elements(content, batch_length):
+    """
+    Yield (slot number, element text) for each question in a batch response, at most once per slot.
+    Elements without a usable 'slot' field fill the slot matching their position.
+    """
+    filled = set()
+    for position, element in enumerate(iter_json_objects(content)):
+        slot_number = position + 1
+        match = re.search(r'["\']slot["\']\s*:\s*(\d+)', element)
+        if match and 1 <= int(match.group(1)) <= batch_length and int(match.group(1)) not in filled:
+            slot_number = int(match.group(1))
+        if slot_number > batch_length or slot_number in filled:
+            continue
+        filled.add(slot_number)
+        yield slot_number, element
+
+def batch_request(difficulty, batch, exam_code="MS-900", model="gpt-4o", temperature=0.7):
+    """
+    Chat completion arguments for one batch of (question_type, selection) slots.
+    """
+    return {
+        'model': model,
+        'messages': [
+            {"role": "system", "content": system_prompt(exam_code)},
+            {"role": "user", "content": generate_batch_prompt(difficulty, batch, exam_code)}
+        ],
+        'temperature': temperature,
+    }
+
+def generate_questions(difficulty, topic, n, exam_code="MS-900", model="gpt-4o", temperature=0.7, slots=None, batch_size=5, scheduler=None, usage=None):
+    """
+    Generate up to n questions with one chat completion per batch of batch_size questions.
+    Slots are (question_type, (topic, objective, sub_objective)) pairs; they are selected here when not given.
+    Each element of the response is parsed and validated on its own, so the result may hold fewer than n questions.
+    Token usage of the batch calls is added to the usage dict if one is passed, and so is the number of
+    calls that failed without a response, as 'failed_calls'.
+    """
+    if slots is None:
+        slots = [(random.choice(QUESTION_TYPES), select_objective(topic, scheduler)) for _ in range(n)]
+
+    questions = []
+    for start in range(0, len(slots), batch_size):
+        batch = slots[start:start + batch_size]
+        try:
+            with timed(LLM_SECONDS, span='llm', call='batch'):
+                response = get_client().chat.completions.create(**batch_request(difficulty, batch, exam_code, model, temperature))
+            content = response_content(response, 'batch', usage, [question_type for question_type, _ in batch])
+        except Exception as e:
+            logging.error(f"Error fetching the question batch: {e}")
+            if usage is not None:
+                usage['failed_calls'] = usage.get('failed_calls', 0) + 1
+            continue
+
+        for slot_number, element in batch_elements(content, len(batch)):
+            question_type, selection = batch[slot_number - 1]
+            question_data = parse_question(element, question_type, repairer(question_type, exam_code, model, usage), call='batch')
+            if question_data is None:
+                logging.error(f"Discarding batch slot {slot_number}")
+                continue
+            question_data.pop('slot', None)
+            questions.append(finalize_question(question_data, difficulty, question_type, selection, exam_code))
+
+    return questions
+
+def extract_json_field(content, field):
+    """
+    Return (True, value) once the value of "field" is complete in a partially streamed JSON object.
+    """
+    key = f'"{field}"'
+    start = content.find(key)
+    if start == -1:
+        return False, None
+    colon = content.find(':', start + len(key))
+    if colon == -1:
+        return False, None
+    position = colon + 1
+    while position < len(content) and content[position].isspace():
+        position += 1
+    try:
+        value, _ = json.JSONDecoder().raw_decode(content, position)
+    except json.JSONDecodeError:
+        return False, None
+    return True, value
+
+def stream_question(difficulty, topic, exam_code="MS-900", model="gpt-4o", temperature=0.7, question_type=None, selection=None):
+    """
+    Generate a question from a streamed chat completion, yielding (event, data) pairs as it is parsed:
+    'question' as soon as the question text and options are complete, then 'complete' with the full
+    question (explanations included) or 'error' if the response could not be used.
+    """
+    request = question_request(difficulty, topic, exam_code, model, temperature, question_type, selection)
+    if request is None:
+        yield 'error', "The question could not be generated."
+        return
+    question_type, (selected_topic, objective, sub_objective), arguments = request
+
+    started = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=temperature,
+        stream = get_client().chat.completions.create(
+            **arguments,
+            stream=True,
+            # The final chunk then carries the usage, for the per-type token counts
+            stream_options={"include_usage": True},
         )
 
-        # Get the content of the API response
-        content = response.choices[0].message.content
-        
-        # Clean and extract JSON segment
-        start = content.find('{')
-        end = content.rfind('}') + 1
-        cleaned_content = content[start:end].strip()
-        
-        # Try to parse the cleaned JSON content
-        question_data = json.loads(cleaned_content)
-        
-        # Add topic and objective information to the question data
-        question_data['topic'] = selected_topic
-        question_data['objective'] = objective
-        question_data['sub_objective'] = sub_objective
-        
-        return question_data
-    
-    except json.JSONDecodeError as e:
-        logging.error(f"Error decoding JSON: {e}")
+        content = ''
+        question_sent = False
+        for chunk in stream:
+            if getattr(chunk, 'usage', None) is not None:
+                record_usage(chunk, 'stream', question_types=[question_type])
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            content += chunk.choices[0].delta.content
+            if question_sent:
+                continue
+            has_question, question_text = extract_json_field(content, 'question')
+            has_options, options = extract_json_field(content, 'options') if has_question else (False, None)
+            if has_options:
+                question_sent = True
+                LLM_SECONDS.observe(time.perf_counter() - started, call='stream_first_question')
+                yield 'question', {
+                    'question': question_text,
+                    'options': options,
+                    'question_type': question_type,
+                    'topic': selected_topic,
+                    'objective': objective,
+                    'sub_objective': sub_objective
+                }
+
+        LLM_SECONDS.observe(time.perf_counter() - started, call='stream')
     except Exception as e:
-        logging.error(f"Error fetching the question: {e}")
-    
-    return None
\ No newline at end of file
+        logging.error(f"Error streaming the question: {e}")
+        yield 'error', "The question could not be generated."
+        return
+
+    question_data = parse_question(content, question_type, repairer(question_type, exam_code, model), call='stream')
+    if question_data is None:
+        yield 'error', "The generated question could not be parsed."
+        return
+    yield 'complete', finalize_question(question_data, difficulty, question_type, (selected_topic, objective, sub_objective), exam_code)
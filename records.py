@@ -0,0 +1,185 @@
+# records.py
+import sys
+from dataclasses import dataclass, field
+from quiz_generator import QUESTION_TYPES
+from scheduler import SLOTS, slot_id
+
+def answer_mask(answers):
+    """
+    Bitmask of 1-based option numbers: option n sets bit n - 1.
+    """
+    mask = 0
+    for answer in answers:
+        if isinstance(answer, int) and answer >= 1:
+            mask |= 1 << (answer - 1)
+    return mask
+
+def mask_answers(mask):
+    """
+    1-based option numbers set in a bitmask, in ascending order.
+    """
+    answers = []
+    number = 1
+    while mask:
+        if mask & 1:
+            answers.append(number)
+        mask >>= 1
+        number += 1
+    return answers
+
+def selection_of(slot):
+    """
+    (topic, objective, sub_objective) for a slot: a syllabus id, or the strings themselves for selections outside it.
+    """
+    return SLOTS[slot] if isinstance(slot, int) else slot
+
+def intern_selection(topic, objective, sub_objective):
+    slot = slot_id(topic, objective, sub_objective)
+    if slot is not None:
+        return slot
+    return tuple(sys.intern(value) if isinstance(value, str) else value for value in (topic, objective, sub_objective))
+
+
+@dataclass(slots=True)
+class Question:
+    """
+    A generated or banked question. The syllabus position is an interned slot id, explanations are
+    aligned with options, and the correct options are a bitmask so grading is a couple of integer ops.
+    """
+    question: str
+    options: tuple
+    explanations: tuple
+    answer_mask: int
+    question_type: str
+    difficulty: str
+    slot: object
+    bank_id: int = None
+    # How the question reached the quiz ('bank', 'llm', 'llm_hedged', 'bank_fallback', ...); not stored
+    source: str = field(default=None, compare=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        options = tuple(data.get('options') or ())
+        explanations = data.get('explanations') or {}
+        question_type = data.get('question_type') or ('multi-response' if 'correct_answers' in data else 'multiple-choice')
+        answers = data.get('correct_answers') if 'correct_answers' in data else [data.get('correct_answer')]
+        return cls(
+            question=data.get('question', ''),
+            options=options,
+            explanations=tuple(explanations.get(str(number), '') for number in range(1, len(options) + 1)),
+            answer_mask=answer_mask(answers or ()),
+            question_type=sys.intern(question_type),
+            difficulty=sys.intern(data.get('difficulty') or ''),
+            slot=intern_selection(data.get('topic'), data.get('objective'), data.get('sub_objective')),
+            bank_id=data.get('bank_id')
+        )
+
+    @property
+    def multi_response(self):
+        return self.question_type == 'multi-response'
+
+    @property
+    def topic(self):
+        return selection_of(self.slot)[0]
+
+    @property
+    def objective(self):
+        return selection_of(self.slot)[1]
+
+    @property
+    def sub_objective(self):
+        return selection_of(self.slot)[2]
+
+    @property
+    def correct_answers(self):
+        return mask_answers(self.answer_mask)
+
+    @property
+    def correct_answer(self):
+        """
+        The correct option number, or the list of them for multi-response questions.
+        """
+        answers = mask_answers(self.answer_mask)
+        return answers if self.multi_response else (answers[0] if answers else None)
+
+    def grade(self, mask):
+        """
+        Return (is_correct, partially_correct) for the options selected in mask.
+        """
+        is_correct = mask == self.answer_mask
+        return is_correct, self.multi_response and not is_correct and bool(mask & self.answer_mask)
+
+    def explanation(self, number):
+        return self.explanations[number - 1] if 1 <= number <= len(self.explanations) else None
+
+    def to_dict(self):
+        """
+        The question in the JSON shape used by the generator, the bank and the page.
+        """
+        topic, objective, sub_objective = selection_of(self.slot)
+        data = {
+            'question': self.question,
+            'options': list(self.options),
+            'explanations': {str(number): explanation for number, explanation in enumerate(self.explanations, 1)},
+            'topic': topic,
+            'objective': objective,
+            'sub_objective': sub_objective,
+            'difficulty': self.difficulty,
+            'question_type': self.question_type
+        }
+        if self.multi_response:
+            data['correct_answers'] = self.correct_answers
+        else:
+            data['correct_answer'] = self.correct_answer
+        if self.bank_id is not None:
+            data['bank_id'] = self.bank_id
+        return data
+
+    def to_compact(self):
+        """
+        Positional list for session storage: syllabus ids and type indices instead of repeated strings.
+        """
+        return [
+            self.slot if isinstance(self.slot, int) else list(self.slot),
+            QUESTION_TYPES.index(self.question_type) if self.question_type in QUESTION_TYPES else self.question_type,
+            self.difficulty, self.question, list(self.options), list(self.explanations), self.answer_mask, self.bank_id
+        ]
+
+    @classmethod
+    def from_compact(cls, row):
+        slot, question_type, difficulty, question, options, explanations, mask, bank_id = row
+        return cls(
+            question=question,
+            options=tuple(options),
+            explanations=tuple(explanations),
+            answer_mask=mask,
+            question_type=QUESTION_TYPES[question_type] if isinstance(question_type, int) else sys.intern(question_type),
+            difficulty=sys.intern(difficulty),
+            slot=slot if isinstance(slot, int) else intern_selection(*slot),
+            bank_id=bank_id
+        )
+
+
+@dataclass(slots=True)
+class Attempt:
+    """
+    One graded answer. The question is referenced by its position in the quiz rather than copied.
+    """
+    position: int
+    slot: object
+    answer_mask: int
+    is_correct: bool
+    partially_correct: bool
+
+    @property
+    def user_answer(self):
+        return mask_answers(self.answer_mask)
+
+    def to_compact(self):
+        return [self.position, self.slot if isinstance(self.slot, int) else list(self.slot), self.answer_mask,
+                int(self.is_correct) | int(self.partially_correct) << 1]
+
+    @classmethod
+    def from_compact(cls, row):
+        position, slot, mask, flags = row
+        return cls(position, slot if isinstance(slot, int) else intern_selection(*slot), mask, bool(flags & 1), bool(flags & 2))
@@ -0,0 +1,207 @@
+# resilience.py
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from metrics import REGISTRY
+
+BREAKER_STATE = REGISTRY.counter('quizzr_llm_breaker_transitions_total', "Circuit breaker state changes.", ['state'])
+HEDGES = REGISTRY.counter('quizzr_llm_hedged_requests_total', "Second requests fired because the first was slow.")
+DEADLINES = REGISTRY.counter('quizzr_llm_deadline_exceeded_total', "Generations abandoned at the deadline.")
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures (errors or responses slower than the slow
+    threshold) and rejects calls for reset_timeout seconds. Then one trial call is let through:
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            self._trial = False
+            if ok:
+                if self.opened_at is not None:
+                    BREAKER_STATE.inc(state='closed')
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    BREAKER_STATE.inc(state='open')
+                    logging.error(f"LLM circuit breaker opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """
+    Recent single-question latencies, used to place the hedge at a percentile of normal behaviour.
+    """
+
+    def __init__(self, size=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class GenerationGuard:
+    """
+    Runs a question generation under a deadline. If the first request is still running at the
+    hedge_percentile of recent latencies, an identical second request is fired and whichever
+    finishes first wins. When the deadline passes, or the circuit breaker is open, fallback()
+    is served instead. Requests still running at the deadline keep going in the background;
+    their questions still reach the bank.
+    """
+
+    def __init__(self, deadline=8.0, hedge_percentile=0.9, slow_seconds=None, breaker=None, max_workers=16):
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.slow_seconds = slow_seconds or deadline
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-guard')
+
+    def hedge_delay(self, deadline):
+        if not self.hedge_percentile:
+            return None
+        delay = self.latencies.percentile(self.hedge_percentile)
+        return delay if delay is not None and delay < deadline else None
+
+    def observe(self, generate, track_latency=False):
+        """
+        Call generate() and feed the outcome to the breaker (and latency tracker). None counts as a failure.
+        """
+        started = time.monotonic()
+        try:
+            result = generate()
+        except Exception as e:
+            logging.error(f"Generation failed: {e}")
+            result = None
+        self._record(result, time.monotonic() - started, track_latency)
+        return result
+
+    def _record(self, result, elapsed, track_latency):
+        if result is not None and track_latency:
+            self.latencies.add(elapsed)
+        self.breaker.record(result is not None and elapsed <= self.slow_seconds)
+
+    def run(self, generate, fallback, deadline=None):
+        """
+        Return (result, path) where path is 'llm', 'llm_hedged', 'fallback' or 'breaker_open'.
+        """
+        if not self.breaker.allow():
+            return fallback(), 'breaker_open'
+        deadline = self.deadline if deadline is None else deadline
+        expires = time.monotonic() + deadline
+        futures = {self._executor.submit(self.observe, generate, True): 'llm'}
+
+        hedge = self.hedge_delay(deadline)
+        if hedge is not None:
+            done, _ = wait(futures, timeout=hedge)
+            if not done:
+                HEDGES.inc()
+                futures[self._executor.submit(self.observe, generate, True)] = 'llm_hedged'
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(expires - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                DEADLINES.inc()
+                break
+            for future in done:
+                if future.result() is not None:
+                    return future.result(), futures[future]
+        return fallback(), 'fallback'
+
+    def stream(self, events, deadline=None):
+        """
+        Relay the (event, data) pairs of the events() generator, which runs in a worker thread, until the
+        deadline. If it passes first, ('deadline', None) is yielded and the stream is left to finish in the
+        background, so its question still reaches the bank. A 'complete' event in time counts as a success
+        for the breaker; callers check breaker.allow() first.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        expires = time.monotonic() + deadline
+        relayed = queue.Queue()
+
+        def pump():
+            started = time.monotonic()
+            result = None
+            try:
+                for event, data in events():
+                    if event == 'complete':
+                        result = data
+                    relayed.put((event, data))
+            except Exception as e:
+                logging.error(f"Generation failed: {e}")
+                relayed.put(('error', "The question could not be generated."))
+            finally:
+                self._record(result, time.monotonic() - started, False)
+                relayed.put(None)
+
+        self._executor.submit(pump)
+        while True:
+            try:
+                item = relayed.get(timeout=max(expires - time.monotonic(), 0))
+            except queue.Empty:
+                DEADLINES.inc()
+                yield 'deadline', None
+                return
+            if item is None:
+                return
+            yield item
+
+_guard = None
+_guard_lock = threading.Lock()
+
+def get_guard():
+    """
+    Return the process-wide generation guard, configured from LLM_DEADLINE, LLM_HEDGE_PERCENTILE
+    (0 disables hedging), LLM_SLOW_SECONDS, LLM_BREAKER_FAILURES and LLM_BREAKER_RESET.
+    """
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                deadline = float(os.environ.get('LLM_DEADLINE', 8))
+                _guard = GenerationGuard(
+                    deadline=deadline,
+                    hedge_percentile=float(os.environ.get('LLM_HEDGE_PERCENTILE', 0.9)),
+                    slow_seconds=float(os.environ.get('LLM_SLOW_SECONDS', deadline)),
+                    breaker=CircuitBreaker(
+                        int(os.environ.get('LLM_BREAKER_FAILURES', 5)),
+                        float(os.environ.get('LLM_BREAKER_RESET', 30))
+                    )
+                )
+    return _guard
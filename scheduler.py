@@ -0,0 +1,184 @@
+# scheduler.py
+import random
+import threading
+from collections import OrderedDict
+from quiz_generator import objectives
+
+# Flat index of every (topic, objective, sub_objective) slot in the syllabus
+SLOTS = []
+for _topic, _topic_objectives in objectives.items():
+    for _objective in _topic_objectives:
+        for _sub_objective in _objective.get('sub_objectives') or [None]:
+            SLOTS.append((_topic, _objective['objective'], _sub_objective))
+
+SLOT_IDS = {slot: slot_id for slot_id, slot in enumerate(SLOTS)}
+TOPIC_SLOTS = {topic: [slot_id for slot_id, slot in enumerate(SLOTS) if slot[0] == topic] for topic in objectives}
+TOPIC_SLOTS['All Topics'] = list(range(len(SLOTS)))
+
+def slot_id(topic, objective, sub_objective):
+    return SLOT_IDS.get((topic, objective, sub_objective))
+
+
+class CoverageScheduler:
+    """
+    Per-quiz rotation over the syllabus slots of a topic.
+
+    Slots are drawn without replacement from a deck using a lazy Fisher-Yates shuffle, so every
+    draw is O(1) and every slot comes up once before any repeats. With weight_weak_areas, slots the
+    user got wrong are dealt more than once in the next cycle.
+    """
+
+    def __init__(self, topic, weight_weak_areas=False, deck=None, position=0, weights=None):
+        self.topic = topic
+        self.weight_weak_areas = weight_weak_areas
+        self.weights = {int(k): v for k, v in (weights or {}).items()}
+        self.deck = deck if deck is not None else self._new_deck()
+        self.position = position
+        self._lock = threading.Lock()
+
+    def _new_deck(self):
+        deck = []
+        for slot in TOPIC_SLOTS[self.topic]:
+            deck.extend([slot] * self.weights.get(slot, 1))
+        return deck
+
+    def draw(self):
+        """
+        Return the id of the next slot.
+        """
+        with self._lock:
+            if self.position >= len(self.deck):
+                self.deck = self._new_deck()
+                self.position = 0
+            pick = random.randrange(self.position, len(self.deck))
+            self.deck[self.position], self.deck[pick] = self.deck[pick], self.deck[self.position]
+            self.position += 1
+            return self.deck[self.position - 1]
+
+    def select(self):
+        """
+        Return the next (topic, objective, sub_objective) selection.
+        """
+        return SLOTS[self.draw()]
+
+    def record_result(self, topic, objective, sub_objective, is_correct, partially_correct=False):
+        """
+        Weight a slot by how the user did on it. Takes effect when the next cycle's deck is dealt.
+        """
+        if not self.weight_weak_areas:
+            return
+        slot = slot_id(topic, objective, sub_objective)
+        if slot is None:
+            return
+        with self._lock:
+            if is_correct:
+                self.weights.pop(slot, None)
+            else:
+                self.weights[slot] = 2
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'kind': 'coverage',
+                'topic': self.topic,
+                'weight_weak_areas': self.weight_weak_areas,
+                'deck': list(self.deck),
+                'position': self.position,
+                'weights': dict(self.weights)
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['topic'], data['weight_weak_areas'], data['deck'], data['position'], data['weights'])
+
+
+# Leitner boxes: missed slots, unseen slots, then three levels of slots answered correctly
+MISSED_BOX, NEW_BOX = 0, 1
+# Relative chance of the next question coming from each box
+BOX_WEIGHTS = (16, 8, 4, 2, 1)
+
+class LeitnerScheduler:
+    """
+    Adaptive rotation that targets the user's weak sub-objectives with Leitner boxes.
+
+    Each slot sits in one box. A wrong answer sends it back to the missed box, a correct one promotes
+    it a box, and a partially correct one leaves it where it is. Draws pick a non-empty box by weight
+    and take the slot at the front of that box, which then moves to the back, so selection and
+    updates are O(1) per question regardless of how many slots the topic has.
+    """
+    adaptive = True
+
+    def __init__(self, topic, boxes=None):
+        self.topic = topic
+        self._boxes = [OrderedDict() for _ in BOX_WEIGHTS]
+        self._box_of = {}
+        self._lock = threading.Lock()
+        if boxes is None:
+            slots = list(TOPIC_SLOTS[topic])
+            random.shuffle(slots)
+            boxes = [(slot, NEW_BOX) for slot in slots]
+        for slot, box in boxes:
+            self._place(slot, box)
+
+    def _place(self, slot, box):
+        previous = self._box_of.get(slot)
+        if previous is not None:
+            del self._boxes[previous][slot]
+        self._boxes[box][slot] = None
+        self._box_of[slot] = box
+
+    def draw(self):
+        """
+        Return the id of the next slot.
+        """
+        with self._lock:
+            candidates = [box for box in range(len(BOX_WEIGHTS)) if self._boxes[box]]
+            box = random.choices(candidates, weights=[BOX_WEIGHTS[box] for box in candidates])[0]
+            slot = next(iter(self._boxes[box]))
+            self._boxes[box].move_to_end(slot)
+            return slot
+
+    def select(self):
+        """
+        Return the next (topic, objective, sub_objective) selection.
+        """
+        return SLOTS[self.draw()]
+
+    def record_result(self, topic, objective, sub_objective, is_correct, partially_correct=False):
+        slot = slot_id(topic, objective, sub_objective)
+        with self._lock:
+            box = self._box_of.get(slot)
+            if box is None:
+                return
+            if is_correct:
+                self._place(slot, min(max(box, NEW_BOX) + 1, len(BOX_WEIGHTS) - 1))
+            elif not partially_correct:
+                self._place(slot, MISSED_BOX)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'kind': 'leitner',
+                'topic': self.topic,
+                'boxes': [[slot, box] for box, slots in enumerate(self._boxes) for slot in slots]
+            }
+
+    @classmethod
+    def from_dict(cls, data, topic=None):
+        """
+        Restore a scheduler. With a different topic, progress on the slots the topics share carries over.
+        """
+        if topic is None or topic == data['topic']:
+            return cls(data['topic'], data['boxes'])
+        shared = set(TOPIC_SLOTS[topic])
+        known = [(slot, box) for slot, box in data['boxes'] if slot in shared]
+        seen = {slot for slot, _ in known}
+        unseen = [slot for slot in TOPIC_SLOTS[topic] if slot not in seen]
+        random.shuffle(unseen)
+        return cls(topic, known + [(slot, NEW_BOX) for slot in unseen])
+
+
+def scheduler_from_dict(data):
+    if data.get('kind') == 'leitner':
+        return LeitnerScheduler.from_dict(data)
+    return CoverageScheduler.from_dict(data)
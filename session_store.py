@@ -0,0 +1,293 @@
+# session_store.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from quiz import Quiz
+from scheduler import scheduler_from_dict
+from records import Question, Attempt, selection_of
+from metrics import REGISTRY, SIZE_BUCKETS, timed
+
+STORE_SECONDS = REGISTRY.histogram('quizzr_session_store_seconds', "Session store operation latency.", ['backend', 'op'])
+STORE_BYTES = REGISTRY.histogram('quizzr_session_store_bytes', "Bytes read or written per session store operation.", ['backend', 'op'], SIZE_BUCKETS)
+
+class MemorySessionStore:
+    """
+    In-process LRU of live Quiz objects keyed by an opaque session id, with TTL eviction.
+    Quizzes are mutated in place, so updates cost nothing beyond refreshing the LRU position.
+    """
+
+    def __init__(self, max_sessions=10000, ttl=3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, quiz):
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = (quiz, time.monotonic())
+            self._evict()
+        return session_id
+
+    def load(self, session_id):
+        with timed(STORE_SECONDS, span='session_store', backend='memory', op='load'), self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            quiz, last_access = entry
+            if time.monotonic() - last_access > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._touch(session_id, quiz)
+            return quiz
+
+    def append_question(self, session_id, quiz, question):
+        with self._lock:
+            if session_id in self._sessions:
+                self._touch(session_id, quiz)
+
+    def record_answer(self, session_id, quiz, attempt):
+        with self._lock:
+            if session_id in self._sessions:
+                self._touch(session_id, quiz)
+
+    def save_scheduler(self, session_id, quiz):
+        with self._lock:
+            if session_id in self._sessions:
+                self._touch(session_id, quiz)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _touch(self, session_id, quiz):
+        self._sessions[session_id] = (quiz, time.monotonic())
+        self._sessions.move_to_end(session_id)
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - last_access <= self.ttl:
+                break
+            del self._sessions[session_id]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_sessions (
+    session_id TEXT PRIMARY KEY,
+    num_questions INTEGER NOT NULL,
+    difficulty TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    score REAL NOT NULL,
+    current_question INTEGER NOT NULL,
+    scheduler TEXT NOT NULL,
+    performance TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_questions (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    slot INTEGER,
+    bank_id INTEGER,
+    PRIMARY KEY (session_id, position)
+);
+CREATE TABLE IF NOT EXISTS session_answers (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_sessions_updated ON quiz_sessions (updated_at);
+"""
+
+class StoredRecord:
+    """
+    A question or attempt of a stored quiz, decoded from the store only when one of its fields is used.
+    Fields passed in (a question's syllabus slot and bank id) are answered without reading the row.
+    """
+
+    def __init__(self, load, **fields):
+        self.__dict__.update(fields)
+        self._load = load
+        self._record = None
+
+    def __getattr__(self, name):
+        if self._record is None:
+            self._record = self._load()
+        return getattr(self._record, name)
+
+
+class SQLiteSessionStore:
+    """
+    Quiz sessions in a SQLite file, shared by every worker process on the host.
+    Questions and answers are stored as one row each, so updates append a row instead of rewriting the quiz.
+    Loading a quiz decodes only its current question; the others are read when something uses them,
+    and their slot and bank id, which duplicate checks and bank draws need, are kept in columns.
+    """
+
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        columns = {column for (_, column, *_) in conn.execute("PRAGMA table_info(quiz_sessions)")}
+        if 'performance' not in columns:
+            conn.execute("ALTER TABLE quiz_sessions ADD COLUMN performance TEXT NOT NULL DEFAULT '{}'")
+        columns = {column for (_, column, *_) in conn.execute("PRAGMA table_info(session_questions)")}
+        for column in ('slot', 'bank_id'):
+            if column not in columns:
+                # Rows written before have NULL here and are read in full
+                conn.execute(f"ALTER TABLE session_questions ADD COLUMN {column} INTEGER")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, quiz):
+        session_id = uuid.uuid4().hex
+        conn = self._connection()
+        with conn:
+            self._expire(conn)
+            conn.execute(
+                "INSERT INTO quiz_sessions (session_id, num_questions, difficulty, topic, score, current_question, scheduler, performance, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, quiz.num_questions, quiz.difficulty, quiz.topic, quiz.score, quiz.current_question,
+                 json.dumps(quiz.scheduler.to_dict()), json.dumps(quiz.performance), time.time())
+            )
+            conn.executemany(
+                "INSERT INTO session_questions (session_id, position, data, slot, bank_id) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, position, *question_row(question)) for position, question in enumerate(quiz.questions)]
+            )
+        return session_id
+
+    def load(self, session_id):
+        with timed(STORE_SECONDS, span='session_store', backend='sqlite', op='load'):
+            return self._load(session_id)
+
+    def _load(self, session_id):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT num_questions, difficulty, topic, score, current_question, scheduler, updated_at, performance FROM quiz_sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[6] > self.ttl:
+            return None
+
+        quiz = Quiz(row[0], row[1], row[2])
+        quiz.score = row[3]
+        quiz.current_question = row[4]
+        quiz.scheduler = scheduler_from_dict(json.loads(row[5]))
+        quiz.performance.update(json.loads(row[7]))
+        rows = conn.execute(
+            "SELECT position, slot, bank_id, CASE WHEN position = ? OR slot IS NULL THEN data END "
+            "FROM session_questions WHERE session_id = ? ORDER BY position", (quiz.current_question, session_id)
+        ).fetchall()
+        answers = conn.execute("SELECT COUNT(*) FROM session_answers WHERE session_id = ?", (session_id,)).fetchone()[0]
+        STORE_BYTES.observe(len(row[5]) + len(row[7]) + sum(len(data or '') for *_, data in rows), backend='sqlite', op='load')
+        quiz.questions = [
+            Question.from_compact(json.loads(data)) if data is not None else StoredRecord(
+                lambda position=position: self._load_record(session_id, 'session_questions', position, Question),
+                slot=slot, bank_id=bank_id, sub_objective=selection_of(slot)[2]
+            )
+            for position, slot, bank_id, data in rows
+        ]
+        quiz.user_performance = [
+            StoredRecord(lambda position=position: self._load_record(session_id, 'session_answers', position, Attempt))
+            for position in range(answers)
+        ]
+        return quiz
+
+    def _load_record(self, session_id, table, position, record_type):
+        row = self._connection().execute(
+            f"SELECT data FROM {table} WHERE session_id = ? AND position = ?", (session_id, position)
+        ).fetchone()
+        if row is None:
+            raise LookupError(f"Session {session_id} has no row {position} in {table}")
+        return record_type.from_compact(json.loads(row[0]))
+
+    def append_question(self, session_id, quiz, question):
+        data, slot, bank_id = question_row(question)
+        scheduler = json.dumps(quiz.scheduler.to_dict())
+        STORE_BYTES.observe(len(data) + len(scheduler), backend='sqlite', op='append_question')
+        conn = self._connection()
+        with timed(STORE_SECONDS, span='session_store', backend='sqlite', op='append_question'), conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_questions (session_id, position, data, slot, bank_id) VALUES (?, ?, ?, ?, ?)",
+                (session_id, len(quiz.questions) - 1, data, slot, bank_id)
+            )
+            conn.execute(
+                "UPDATE quiz_sessions SET scheduler = ?, updated_at = ? WHERE session_id = ?",
+                (scheduler, time.time(), session_id)
+            )
+
+    def record_answer(self, session_id, quiz, attempt):
+        data = json.dumps(attempt.to_compact())
+        scheduler = json.dumps(quiz.scheduler.to_dict())
+        performance = json.dumps(quiz.performance)
+        STORE_BYTES.observe(len(data) + len(scheduler) + len(performance), backend='sqlite', op='record_answer')
+        conn = self._connection()
+        with timed(STORE_SECONDS, span='session_store', backend='sqlite', op='record_answer'), conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_answers VALUES (?, ?, ?)",
+                (session_id, len(quiz.user_performance) - 1, data)
+            )
+            conn.execute(
+                "UPDATE quiz_sessions SET score = ?, current_question = ?, scheduler = ?, performance = ?, updated_at = ? WHERE session_id = ?",
+                (quiz.score, quiz.current_question, scheduler, performance, time.time(), session_id)
+            )
+
+    def save_scheduler(self, session_id, quiz):
+        scheduler = json.dumps(quiz.scheduler.to_dict())
+        STORE_BYTES.observe(len(scheduler), backend='sqlite', op='save_scheduler')
+        conn = self._connection()
+        with timed(STORE_SECONDS, span='session_store', backend='sqlite', op='save_scheduler'), conn:
+            conn.execute(
+                "UPDATE quiz_sessions SET scheduler = ?, updated_at = ? WHERE session_id = ?",
+                (scheduler, time.time(), session_id)
+            )
+
+    def delete(self, session_id):
+        conn = self._connection()
+        with conn:
+            for table in ('quiz_sessions', 'session_questions', 'session_answers'):
+                conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+    def _expire(self, conn):
+        cutoff = time.time() - self.ttl
+        expired = [session_id for (session_id,) in conn.execute(
+            "SELECT session_id FROM quiz_sessions WHERE updated_at < ?", (cutoff,)
+        )]
+        for table in ('quiz_sessions', 'session_questions', 'session_answers'):
+            conn.executemany(f"DELETE FROM {table} WHERE session_id = ?", [(session_id,) for session_id in expired])
+
+
+def question_row(question):
+    """
+    (data, slot, bank_id) columns of a session_questions row. Slots outside the syllabus are not
+    ids, so those rows keep slot NULL and are read in full.
+    """
+    return json.dumps(question.to_compact()), question.slot if isinstance(question.slot, int) else None, question.bank_id
+
+def create_session_store():
+    """
+    Build the store selected by QUIZZR_SESSION_STORE ('memory' or 'sqlite').
+    """
+    backend = os.environ.get('QUIZZR_SESSION_STORE', 'memory')
+    ttl = int(os.environ.get('QUIZZR_SESSION_TTL', 3600))
+    if backend == 'sqlite':
+        return SQLiteSessionStore(os.environ.get('QUIZZR_SESSION_DB', 'sessions.db'), ttl=ttl)
+    if backend == 'memory':
+        return MemorySessionStore(int(os.environ.get('QUIZZR_MAX_SESSIONS', 10000)), ttl=ttl)
+    raise ValueError(f"Unknown session store backend: {backend}")
@@ -1,88 +1,26 @@
 # web_search.py
-import time
-from selenium import webdriver
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from urllib.parse import quote_plus
 import logging
 import re
+import providers
+from doc_cache import get_doc_cache, cache_key
+from metrics import REGISTRY
+
+DOC_CACHE_LOOKUPS = REGISTRY.counter('quizzr_docs_cache_lookups_total', "Documentation cache lookups.", ['result'])
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def setup_driver():
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    options.add_argument("--log-level=3")
-    options.add_argument('--disable-dev-shm-usage')
-    return webdriver.Chrome('C:\Program Files\Google\Chrome\chromedriver.exe', options=options)
+_search = None
 
 def search_microsoft_docs(query, topic, sub_objective=None, num_results=3):
-    # Enhance the search query with MS-900 specific terms
-    ms900_terms = ["MS-900", "Microsoft 365 Fundamentals"]
-    enhanced_query = f"{query} {' '.join(ms900_terms)}"
-    
-    if topic:
-        enhanced_query += f" {topic}"
-    if sub_objective:
-        enhanced_query += f" {sub_objective}"
-    
-    encoded_query = quote_plus(f"site:microsoft.com {enhanced_query}")
-    url = f"https://www.bing.com/search?q={encoded_query}"
-    
-    driver = setup_driver()
-    try:
-        driver.get(url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "b_algo")))
-        
-        results = []
-        for result in driver.find_elements(By.CLASS_NAME, "b_algo"):
-            try:
-                title_element = WebDriverWait(result, 5).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "h2"))
-                ).find_element(By.TAG_NAME, "a")
-                
-                link = title_element.get_attribute("href")
-                title = title_element.text
-                
-                snippet = extract_snippet(result)
-                
-                if link and 'microsoft.com' in link:
-                    relevance_score = calculate_relevance(title, snippet, query, topic, sub_objective)
-                    results.append({
-                        'title': title,
-                        'link': link,
-                        'snippet': snippet,
-                        'relevance': relevance_score
-                    })
-            except (TimeoutException, NoSuchElementException) as e:
-                logging.warning(f"Error processing a search result: {e}")
-                continue
-        
-        # Sort results by relevance and return top matches
-        sorted_results = sorted(results, key=lambda x: x['relevance'], reverse=True)
-        return sorted_results[:num_results]
-    
-    except Exception as e:
-        logging.error(f"Error during Microsoft Docs search: {e}")
-        return []
-    finally:
-        driver.quit()
-
-def extract_snippet(result):
-    snippet_classes = ["b_caption", "b_snippet", "b_richSnippet"]
-    for class_name in snippet_classes:
-        try:
-            return result.find_element(By.CLASS_NAME, class_name).text
-        except NoSuchElementException:
-            continue
-    return "No snippet available"
+    """
+    Search with the DOCS_BACKEND provider (bing by default); the backend is loaded on the first search.
+    Returns None when the search failed, as opposed to an empty list when it found nothing.
+    """
+    global _search
+    if _search is None:
+        _search = providers.create('docs_search')
+    return _search(query, topic, sub_objective, num_results)
 
 def calculate_relevance(title, snippet, query, topic, sub_objective):
     relevance_score = 0
@@ -118,9 +56,44 @@ def calculate_relevance(title, snippet, query, topic, sub_objective):
     
     return relevance_score
 
+def documentation_query(topic, objective, sub_objective):
+    return f"{topic} {objective} {sub_objective}"
+
+def get_cached_documentation(topic, sub_objective=None):
+    """
+    Return (hit, (link, snippet)) without running a browser search.
+    """
+    if providers.backend_name('docs_search') == 'local':
+        # The offline index answers in well under a millisecond, so it is not cached
+        try:
+            docs_results = search_microsoft_docs(topic, topic, sub_objective)
+        except (OSError, ValueError, KeyError) as e:
+            # A missing or corrupt index costs the answer its documentation link, not the answer itself
+            logging.error(f"Error loading the local documentation index: {e}")
+            return True, (None, None)
+        if docs_results:
+            return True, (docs_results[0]['link'], docs_results[0]['snippet'])
+        return True, (None, None)
+    hit, cached = get_doc_cache().get(cache_key(topic, sub_objective))
+    DOC_CACHE_LOOKUPS.inc(result='hit' if hit else 'miss')
+    return hit, cached
+
 def get_official_documentation(topic, sub_objective=None):
+    if providers.backend_name('docs_search') == 'local':
+        return get_cached_documentation(topic, sub_objective)[1]
+    # Not counted in DOC_CACHE_LOOKUPS: the answer that queued this lookup already was
+    hit, cached = get_doc_cache().get(cache_key(topic, sub_objective))
+    if hit:
+        return cached
+
     docs_results = search_microsoft_docs(topic, topic, sub_objective)
+    if docs_results is None:
+        # A failed search says nothing about the page, so it is retried on the next answer
+        return None, None
     if docs_results:
-        return docs_results[0]['link'], docs_results[0]['snippet']
-    logging.warning("No official documentation found")
-    return None, None
\ No newline at end of file
+        link, snippet = docs_results[0]['link'], docs_results[0]['snippet']
+    else:
+        logging.warning("No official documentation found")
+        link, snippet = None, None
+    get_doc_cache().put(cache_key(topic, sub_objective), link, snippet)
+    return link, snippet
\ No newline at end of file